@@ -0,0 +1,399 @@
+import os
+import sys
+import time
+import tempfile
+import random
+import pygame
+import minesweeper.board
+import minesweeper.camera
+import minesweeper.endless
+import minesweeper.bitboard
+import minesweeper.history
+import minesweeper.heatmap
+import minesweeper.solver
+
+
+# benchmark constants
+STORAGE_SIZES = (250, 1000, 2000)
+COUNT_SIZES = (1000, 4000)
+FLOOD_SIZES = (100, 500, 1000, 2000)  # the revealed set of 2000^2 cells already takes over 500MB
+SCROLL_DISTANCES = (10000, 100000)
+MINE_SIZES = (1000,)
+BITBOARD_SIZES = (250, 1000, 2000)
+SAVE_SIZES = (1000, 4000)
+MINE_CHANCES = (0.05, 0.3, 0.6, 0.9)
+VIEW_WIDTH = 32
+VIEW_HEIGHT = 24
+SAMPLE_COUNT = 100000
+VIEWPORT_SIZES = (1000, 4000, 10000)
+WINDOW_SIZE = (640, 480)
+FRAME_COUNT = 20
+RESET_COUNTS = (100, 1000)
+BATCH_SIZES = (100, 1000, 10000)
+BATCH_BOARD_SIZE = 500
+BATCH_MINE_CHANCE = 0.2  # dense enough that single uncovers do not flood the board
+HISTORY_SIZES = (1000, 2000)
+HISTORY_MOVES = 500
+HEATMAP_SIZES = (100, 300)
+HEATMAP_MOVES = 50
+OVERVIEW_SIZES = (1000, 3163)  # 3163^2 is 10M cells
+
+
+def timeIt(function, *args):
+    """runs function once and returns the result and the elapsed seconds"""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def boardTypes():
+    """returns the board backends that can be used in this environment"""
+    types = [minesweeper.board.Board]
+    if minesweeper.board.numpy is not None:
+        types.append(minesweeper.board.ArrayBoard)
+    return types
+
+
+def plantMines(board, mineCount):
+    for index in random.sample(range(board.width * board.height), mineCount):
+        board.setMine(index % board.width, index // board.width)
+
+
+def matrixBytes(board):
+    """returns the amount of bytes used by the cell storage of the board"""
+    if isinstance(board.m, list):
+        # the cell values are small cached ints, so only the lists count
+        return sys.getsizeof(board.m) + sum(sys.getsizeof(row) for row in board.m)
+    return board.m.nbytes
+
+
+def readCells(board, positions):
+    for (x, y) in positions:
+        board.isVisible(x, y)
+        board.hasMine(x, y)
+
+
+def readRows(board):
+    for y in range(board.height):
+        board.getRow(y)
+
+
+def readRegions(board, size):
+    for y in range(0, board.height, size):
+        for x in range(0, board.width, size):
+            board.getRegion(x, y, size, size)
+
+
+def benchmarkStorage(sizes=STORAGE_SIZES):
+    """compares the list and the array backend of the board"""
+    print('storage: %d random cell reads, all rows, 32x32 regions' % SAMPLE_COUNT)
+    for size in sizes:
+        positions = [(random.randrange(size), random.randrange(size)) for i in range(SAMPLE_COUNT)]
+        for boardType in boardTypes():
+            board, createTime = timeIt(boardType, size, size)
+            _, cellTime = timeIt(readCells, board, positions)
+            _, rowTime = timeIt(readRows, board)
+            _, regionTime = timeIt(readRegions, board, 32)
+            print('%5dx%-5d %-10s %9.1f KiB  create %7.3fs  cells %7.3fs  rows %7.3fs  regions %7.3fs' % (
+                size, size, boardType.__name__, matrixBytes(board) / 1024.0,
+                createTime, cellTime, rowTime, regionTime))
+
+
+def benchmarkCounts(sizes=COUNT_SIZES):
+    """times the neighbourhood mine count pass done at board creation"""
+    print('counts: neighbourhood mine counts with %d%% mines' % (minesweeper.board.MINE_CHANCE * 100))
+    for size in sizes:
+        for boardType in boardTypes():
+            board = boardType(size, size)
+            plantMines(board, int(size * size * minesweeper.board.MINE_CHANCE))
+            _, countTime = timeIt(board.computeMineCounts)
+            print('%5dx%-5d %-10s %7.3fs' % (size, size, boardType.__name__, countTime))
+
+
+def benchmarkFlood(sizes=FLOOD_SIZES):
+    """times the worst case reveal, a click on a board without any mines
+    the fill still reveals one cell at a time, the spans only replace the recursion
+    """
+    print('flood: uncover a board without mines, cell by cell')
+    for size in sizes:
+        for boardType in boardTypes():
+            board = boardType(size, size)
+            revealedCount, fillTime = timeIt(lambda: len(board.floodFill(size // 2, size // 2)))
+            print('%5dx%-5d %-10s %9d cells %7.3fs %12.0f cells/s' % (
+                size, size, boardType.__name__, revealedCount, fillTime, revealedCount / fillTime))
+            del board
+
+
+def benchmarkMines(sizes=MINE_SIZES):
+    """times seeded board creation from sparse to dense boards"""
+    print('mines: createBoard with a safe first click')
+    for size in sizes:
+        for boardType in boardTypes():
+            for mineChance in MINE_CHANCES:
+                mineCount = int(size * size * mineChance)
+                _, createTime = timeIt(minesweeper.board.createBoard, size, size, mineCount, None, boardType,
+                                       1, (size // 2, size // 2))
+                print('%5dx%-5d %-10s %3d%% mines %7.3fs' % (size, size, boardType.__name__, mineChance * 100, createTime))
+
+
+def countVisibleCells(board):
+    """the per cell version of the full board check done by the bitboard"""
+    return sum(1 for y in range(board.height) for x in range(board.width) if board.isVisible(x, y))
+
+
+def benchmarkBitboard(sizes=BITBOARD_SIZES):
+    """compares full board operations of the list board and the bitboard,
+    the view and the row read from a played board have to be the same on both
+    """
+    print('bitboard: counts, empty board flood, per cell and plane visibility count, win check, %dx%d view and row read' % (
+        VIEW_WIDTH, VIEW_HEIGHT))
+    for size in sizes:
+        cells = []
+        for boardType in (minesweeper.board.Board, minesweeper.bitboard.BitBoard):
+            board = minesweeper.board.createBoard(size, size, 0, boardType=boardType, seed=1)
+            _, countTime = timeIt(board.computeMineCounts)
+            _, floodTime = timeIt(board.floodFill, 0, 0)
+            _, scanTime = timeIt(countVisibleCells, board) if boardType is minesweeper.board.Board else \
+                timeIt(minesweeper.bitboard.popcount, board.visible)
+            _, solvedTime = timeIt(board.isSolved)
+
+            board = minesweeper.board.createBoard(size, size, boardType=boardType, seed=1, safeCell=(0, 0))
+            board.uncover(0, 0)
+            board.toggleFlag(size // 2, size // 2)
+            view, viewTime = timeIt(board.getRegion, size // 2 - VIEW_WIDTH // 2, size // 2 - VIEW_HEIGHT // 2,
+                                    VIEW_WIDTH, VIEW_HEIGHT)
+            row, rowTime = timeIt(board.getRow, size // 2)
+            cells.append((view, row, board.getRegion(-1, -1, VIEW_WIDTH, VIEW_HEIGHT)))
+            print('%5dx%-5d %-10s counts %7.3fs  flood %7.3fs  visible %9.6fs  solved %9.6fs  view %9.6fs  row %9.6fs' % (
+                size, size, boardType.__name__, countTime, floodTime, scanTime, solvedTime, viewTime, rowTime))
+        assert cells[0] == cells[1], 'the bitboard cells differ from the board'
+
+
+def benchmarkSave(sizes=SAVE_SIZES):
+    """times saving a board, opening it again and reading a window of cells"""
+    print('save: save, load and read a %dx%d view' % (VIEW_WIDTH, VIEW_HEIGHT))
+    boardType = boardTypes()[-1]
+    path = os.path.join(tempfile.mkdtemp(), 'board.sav')
+    for size in sizes:
+        board = minesweeper.board.createBoard(size, size, boardType=boardType, seed=1, safeCell=(0, 0))
+        board.uncover(0, 0)
+        _, saveTime = timeIt(board.save, path)
+        loaded, loadTime = timeIt(minesweeper.board.Board.load, path)
+        _, viewTime = timeIt(loaded.getRegion, size // 2, size // 2, VIEW_WIDTH, VIEW_HEIGHT)
+        print('%5dx%-5d %9.1f KiB  save %7.3fs  load %9.6fs  view %9.6fs' % (
+            size, size, os.path.getsize(path) / 1024.0, saveTime, loadTime, viewTime))
+        loaded.close()
+    os.remove(path)
+
+
+def benchmarkEndless(distances=SCROLL_DISTANCES):
+    """scrolls the viewport of an endless board to the right and plays a cell in every view"""
+    print('endless: scroll a %dx%d view, uncover one cell per step' % (VIEW_WIDTH, VIEW_HEIGHT))
+    for distance in distances:
+        board = minesweeper.endless.EndlessBoard(seed=1)
+        start = time.perf_counter()
+        for x in range(0, distance, VIEW_WIDTH // 2):
+            board.setViewport(x, 0, VIEW_WIDTH, VIEW_HEIGHT)
+            board.getRegion(x, 0, VIEW_WIDTH, VIEW_HEIGHT)
+            cellX, cellY = x + random.randrange(VIEW_WIDTH), random.randrange(VIEW_HEIGHT)
+            if not board.hasMine(cellX, cellY):
+                board.uncover(cellX, cellY)
+        scrollTime = time.perf_counter() - start
+        print('%9d cells scrolled %7.3fs %9.1f KiB in memory, %d cells visible' % (
+            distance * VIEW_HEIGHT, scrollTime, board.memoryUsage() / 1024.0, board.visibleCount))
+
+
+def benchmarkViewport(sizes=VIEWPORT_SIZES):
+    """draws a window sized view of boards of growing size, while panning across them"""
+    pygame.init()
+    surface = pygame.Surface(WINDOW_SIZE)
+    boardType = boardTypes()[-1]
+    print('viewport: %d panned frames of a %dx%d window, %s' % (FRAME_COUNT, WINDOW_SIZE[0], WINDOW_SIZE[1], boardType.__name__))
+    for size in sizes:
+        board = boardType(size, size)
+        camera = minesweeper.camera.Camera(surface.get_rect())
+        camera.centerOn(size // 2, size // 2)
+        start = time.perf_counter()
+        for frame in range(FRAME_COUNT):
+            camera.pan(camera.cellSize, 0)
+            camera.draw(board, surface)
+        frameTime = (time.perf_counter() - start) / FRAME_COUNT
+        print('%5dx%-5d %9.6fs per frame' % (size, size, frameTime))
+        del board
+
+
+def benchmarkResets(counts=RESET_COUNTS):
+    """creates and draws a new window sized board per reset, like pressing r in the game"""
+    pygame.init()
+    print('resets: create and draw a %dx%d board' % (WINDOW_SIZE[0] // minesweeper.board.CELL_SIZE,
+                                                      WINDOW_SIZE[1] // minesweeper.board.CELL_SIZE))
+    for count in counts:
+        start = time.perf_counter()
+        for reset in range(count):
+            board = minesweeper.board.createRandomBoard(*WINDOW_SIZE)
+            board.draw()
+        resetTime = time.perf_counter() - start
+        print('%6d resets %7.3fs %9.6fs per reset' % (count, resetTime, resetTime / count))
+
+
+def uncoverEach(board, cells):
+    for (x, y) in cells:
+        board.uncover(x, y)
+
+
+def benchmarkBatch(sizes=BATCH_SIZES):
+    """uncovers batches of random safe cells one call per cell and with a single uncoverMany"""
+    size = BATCH_BOARD_SIZE
+    mineCount = int(size * size * BATCH_MINE_CHANCE)
+    print('batch: uncover random safe cells on a %dx%d board with %d mines' % (size, size, mineCount))
+    for boardType in boardTypes() + [minesweeper.bitboard.BitBoard]:
+        for batchSize in sizes:
+            times = []
+            for uncoverCells in (uncoverEach, minesweeper.board.Board.uncoverMany):
+                board = minesweeper.board.createBoard(size, size, mineCount, boardType=boardType, seed=1)
+                rng = random.Random(batchSize)
+                cells = [(x, y) for (x, y) in ((rng.randrange(size), rng.randrange(size)) for i in range(batchSize))
+                         if not board.hasMine(x, y)]
+                _, elapsed = timeIt(uncoverCells, board, cells)
+                times.append(elapsed)
+            print('%-10s %6d cells  each %8.4fs  batch %8.4fs' % (boardType.__name__, batchSize, times[0], times[1]))
+
+
+def benchmarkHistory(sizes=HISTORY_SIZES):
+    """records a version after every random move, then undoes all of them"""
+    print('history: %d recorded moves, memory compared to a copy of the cells per move' % HISTORY_MOVES)
+    for size in sizes:
+        board = minesweeper.board.createBoard(size, size, int(size * size * BATCH_MINE_CHANCE),
+                                              boardType=minesweeper.history.TiledBoard, seed=1)
+        history = minesweeper.history.History(board)
+        rng = random.Random(1)
+        start = time.perf_counter()
+        for move in range(HISTORY_MOVES):
+            x, y = rng.randrange(size), rng.randrange(size)
+            if board.hasMine(x, y):
+                board.toggleFlag(x, y)
+            else:
+                board.uncover(x, y)
+            history.record()
+        moveTime = (time.perf_counter() - start) / HISTORY_MOVES
+        _, undoTime = timeIt(lambda: [history.undo() for move in range(HISTORY_MOVES)])
+        print('%5dx%-5d move + record %9.6fs  undo %9.6fs  history %9.1f KiB  copies %9.1f KiB' % (
+            size, size, moveTime, undoTime / HISTORY_MOVES, history.memoryUsage() / 1024.0,
+            (HISTORY_MOVES + 1) * size * size / 1024.0))
+
+
+# a 4x4 board, where a wrong flag leaves the numbers around the hidden cells a, b and c
+# with {a, b} = 1, {b, c} = 1 and {a, c} = 1 mines, which the rules do not notice
+WRONG_FLAG_MINES = ((2, 0), (1, 2), (1, 1), (0, 2), (2, 2), (0, 3), (1, 3), (2, 3), (3, 0), (3, 1))
+WRONG_FLAG_FLAGS = ((1, 1), (0, 2), (2, 2), (0, 3), (1, 3), (2, 3), (3, 0), (3, 1), (3, 2))
+WRONG_FLAG_VISIBLE = ((1, 0), (0, 1), (2, 1), (3, 3))
+
+
+def createWrongFlagBoard(boardType=minesweeper.board.Board):
+    """creates the board of WRONG_FLAG_MINES, whose flags contradict its numbers"""
+    board = boardType(4, 4)
+    for (x, y) in WRONG_FLAG_MINES:
+        board.setMine(x, y)
+    board.computeMineCounts()
+    for (x, y) in WRONG_FLAG_VISIBLE:
+        board.setVisible(x, y)
+    for (x, y) in WRONG_FLAG_FLAGS:
+        board.setFlag(x, y)
+    return board
+
+
+def checkWrongFlag():
+    """the solver and the heatmap must not fail on a wrong flag, nothing is deduced for the contradicting component"""
+    solution = minesweeper.solver.Solver(createWrongFlagBoard()).solve()
+    assert not solution.safe and not solution.mines and not solution.probabilities, 'the solver trusts a wrong flag'
+
+    # the heatmap leaves the contradicting cells unshaded after the flag is placed
+    board = createWrongFlagBoard(minesweeper.history.TiledBoard)
+    board.removeFlag(3, 2)
+    heatmap = minesweeper.heatmap.Heatmap(board)
+    board.setFlag(3, 2)
+    heatmap.update([(3, 2)])
+    assert heatmap.levels == {(0, 0): 0, (2, 0): 0, (1, 2): 0}, 'the heatmap shades a contradicting component'
+
+
+def benchmarkHeatmap(sizes=HEATMAP_SIZES):
+    """updates the heatmap after random safe moves, compared to solving the whole board again"""
+    pygame.init()
+    surface = pygame.Surface(WINDOW_SIZE)
+    checkWrongFlag()
+    print('heatmap: %d random safe moves with %d%% mines, update and draw per move' % (HEATMAP_MOVES, 100 * BATCH_MINE_CHANCE))
+    for size in sizes:
+        board = minesweeper.board.createBoard(size, size, int(size * size * BATCH_MINE_CHANCE), seed=1)
+        heatmap = minesweeper.heatmap.Heatmap(board)
+        camera = minesweeper.camera.Camera(surface.get_rect())
+        rng = random.Random(1)
+        updateTime = drawTime = solveTime = 0.0
+        for move in range(HEATMAP_MOVES):
+            x, y = rng.randrange(size), rng.randrange(size)
+            while board.hasMine(x, y) or board.isVisible(x, y):
+                x, y = rng.randrange(size), rng.randrange(size)
+            board.uncover(x, y)
+            camera.centerOn(x, y)
+            _, elapsed = timeIt(heatmap.update, board.lastRevealed)
+            updateTime += elapsed
+            _, elapsed = timeIt(camera.draw, board, surface, heatmap)
+            drawTime += elapsed
+            _, elapsed = timeIt(lambda: minesweeper.solver.Solver(board).solve())
+            solveTime += elapsed
+        print('%5dx%-5d update %9.6fs  draw %9.6fs  full solve %9.6fs' % (
+            size, size, updateTime / HEATMAP_MOVES, drawTime / HEATMAP_MOVES, solveTime / HEATMAP_MOVES))
+
+
+def benchmarkOverview(sizes=OVERVIEW_SIZES):
+    """zooms out until the whole board fits the window, then draws frames with a move between them"""
+    pygame.init()
+    surface = pygame.Surface(WINDOW_SIZE)
+    boardType = boardTypes()[-1]
+    print('overview: whole board in a %dx%d window, %s' % (WINDOW_SIZE[0], WINDOW_SIZE[1], boardType.__name__))
+    for size in sizes:
+        board = minesweeper.board.createBoard(size, size, int(size * size * BATCH_MINE_CHANCE), boardType=boardType, seed=1)
+        camera = minesweeper.camera.Camera(surface.get_rect())
+        while (size >> camera.level) > min(WINDOW_SIZE) or not camera.isOverview():
+            camera.zoom(0.5)
+        _, buildTime = timeIt(camera.draw, board, surface)
+
+        rng = random.Random(1)
+        drawTime = 0.0
+        for frame in range(FRAME_COUNT):
+            board.uncover(rng.randrange(size), rng.randrange(size))
+            _, elapsed = timeIt(camera.draw, board, surface)
+            drawTime += elapsed
+        camera.moved = True
+        _, fullTime = timeIt(camera.draw, board, surface)
+        print('%5dx%-5d level %d  build %8.4fs  move + draw %9.6fs  full draw %9.6fs' % (
+            size, size, camera.level, buildTime, drawTime / FRAME_COUNT, fullTime))
+
+
+BENCHMARKS = {'storage': benchmarkStorage,
+              'counts': benchmarkCounts,
+              'flood': benchmarkFlood,
+              'mines': benchmarkMines,
+              'bitboard': benchmarkBitboard,
+              'save': benchmarkSave,
+              'endless': benchmarkEndless,
+              'viewport': benchmarkViewport,
+              'resets': benchmarkResets,
+              'batch': benchmarkBatch,
+              'history': benchmarkHistory,
+              'heatmap': benchmarkHeatmap,
+              'overview': benchmarkOverview}
+
+
+def main():
+    """usage: benchmark [name [size ...]]"""
+    if len(sys.argv) > 2:  # run a single benchmark with the passed board sizes
+        BENCHMARKS[sys.argv[1]](tuple(int(size) for size in sys.argv[2:]))
+        return
+
+    names = sys.argv[1:] or list(BENCHMARKS.keys())
+    for name in names:
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main()
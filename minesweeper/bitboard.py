@@ -0,0 +1,254 @@
+import struct
+import minesweeper.board
+
+from minesweeper.board import VISIBLE, MINE, FLAG, CELL_SIZE
+
+# snapshot format: width, height, followed by the mine, visible and flag planes
+SNAPSHOT_HEADER = struct.Struct('<II')
+
+# the count bits are kept as four separate planes
+COUNT_BITS = 4
+
+if hasattr(int, 'bit_count'):
+    popcount = int.bit_count
+else:
+    def popcount(bits):
+        return bin(bits).count('1')
+
+
+class BitBoard(minesweeper.board.Board):
+    """"a board that keeps each cell bit as a plane, a python int with one bit per cell in row major order
+
+    whole board queries like the win check, region counts and the
+    neighbourhood counts are shift, and & popcount operations on the planes.
+    single cells can still be read and written, but every access costs
+    a pass over the plane
+    """
+
+    def __init__(self, width, height, cellSize=CELL_SIZE):
+        minesweeper.board.Board.__init__(self, width, height, cellSize)
+
+        # masks used to stop horizontal shifts from wrapping into the next row
+        rowMask = (1 << width) - 1
+        rows = self.full // rowMask if width else 0  # the lowest bit of every row
+        self.notFirstColumn = rows * (rowMask ^ 1)
+        self.notLastColumn = rows * (rowMask ^ (1 << (width - 1))) if width else 0
+
+    def createMatrix(self, width, height):
+        """creates the planes, the matrix itself is not used"""
+        self.full = (1 << (width * height)) - 1
+        self.mines = 0
+        self.visible = 0
+        self.flags = 0
+        self.counts = [0] * COUNT_BITS
+        return None
+
+    def get(self, x, y):
+        if not self.validLocation(x, y):
+            return False
+
+        index = y * self.width + x
+        value = (self.mines >> index & 1) * MINE | (self.visible >> index & 1) * VISIBLE | (self.flags >> index & 1) * FLAG
+        for (bit, plane) in enumerate(self.counts):
+            value |= (plane >> index & 1) << bit
+        return value
+
+    def _set(self, x, y, bits):
+        if not self.validLocation(x, y):
+            return False
+
+        if not self.dirty:  # a pending full repaint covers the cell
+            self.dirtyCells.add((x, y))
+        cell = 1 << (y * self.width + x)
+        if bits & MINE:
+            self.mines |= cell
+        if bits & VISIBLE:
+            self.visible |= cell
+        if bits & FLAG:
+            self.flags |= cell
+        for bit in range(COUNT_BITS):
+            if bits & (1 << bit):
+                self.counts[bit] |= cell
+        return True
+
+    def _clear(self, x, y, bits):
+        if not self.validLocation(x, y):
+            return False
+
+        if not self.dirty:  # a pending full repaint covers the cell
+            self.dirtyCells.add((x, y))
+        cell = ~(1 << (y * self.width + x))
+        if bits & MINE:
+            self.mines &= cell
+        if bits & VISIBLE:
+            self.visible &= cell
+        if bits & FLAG:
+            self.flags &= cell
+        for bit in range(COUNT_BITS):
+            if bits & (1 << bit):
+                self.counts[bit] &= cell
+        return True
+
+    def getRow(self, y):
+        """returns a copy of the cell values of row y"""
+        return self.getRegion(0, y, self.width, 1)[0]
+
+    def getRegion(self, x, y, width, height):
+        """returns the cell values of the width x height region at x, y
+        as a list of rows, the region is clipped to the board"""
+        left, right = max(x, 0), min(x + width, self.width)
+        planes = [(self.mines, MINE), (self.visible, VISIBLE), (self.flags, FLAG)]
+        planes.extend((plane, 1 << bit) for (bit, plane) in enumerate(self.counts))
+
+        # the region row is masked out of the plane once, so the cells only shift a small int
+        rowMask = (1 << max(right - left, 0)) - 1
+        region = []
+        for regionY in range(max(y, 0), min(y + height, self.height)):
+            row = [0] * (right - left)
+            for (plane, value) in planes:
+                bits = (plane >> (regionY * self.width + left)) & rowMask
+                while bits:
+                    lowest = bits & -bits
+                    row[lowest.bit_length() - 1] |= value
+                    bits ^= lowest
+            region.append(row)
+        return region
+
+    def getRegionMask(self, x, y, width, height):
+        """returns a plane with the bits of the width x height region at x, y set"""
+        left, right = max(x, 0), min(x + width, self.width)
+        if left >= right:
+            return 0
+        rowBits = ((1 << (right - left)) - 1) << left
+        mask = 0
+        for regionY in range(max(y, 0), min(y + height, self.height)):
+            mask |= rowBits << (regionY * self.width)
+        return mask
+
+    def countRegion(self, plane, x, y, width, height):
+        """returns how many bits of the plane are set inside the region"""
+        return popcount(plane & self.getRegionMask(x, y, width, height))
+
+    def getNeighbourPlanes(self, plane):
+        """returns the plane shifted onto each of the 8 neighbours of every cell"""
+        left = (plane << 1) & self.notFirstColumn
+        right = (plane >> 1) & self.notLastColumn
+        planes = [left, right]
+        for row in (plane, left, right):
+            planes.append((row << self.width) & self.full)
+            planes.append(row >> self.width)
+        return planes
+
+    def dilate(self, plane):
+        """returns the plane grown by one cell in every direction"""
+        row = plane | ((plane << 1) & self.notFirstColumn) | ((plane >> 1) & self.notLastColumn)
+        return (row | (row << self.width) | (row >> self.width)) & self.full
+
+    def computeMineCounts(self):
+        """stores the neighbourhood mine count of every cell in the count planes
+        the 8 shifted mine planes are added with bit sliced adders
+        """
+        counts = [0] * COUNT_BITS
+        for carry in self.getNeighbourPlanes(self.mines):
+            for bit in range(COUNT_BITS):
+                counts[bit], carry = counts[bit] ^ carry, counts[bit] & carry
+        self.counts = counts
+        self.dirty = True
+
+    def plantMines(self, mineCount, seed=None, safeCell=None):
+        """places mineCount mines on the empty board and counts the neighbouring mines of every cell"""
+        cellBytes = bytearray((self.width * self.height + 7) // 8)
+        for index in self.getMinePositions(mineCount, seed, safeCell):
+            cellBytes[index >> 3] |= 1 << (index & 7)
+        self.mines |= int.from_bytes(bytes(cellBytes), 'little')
+        self.mineCount += mineCount
+        self.computeMineCounts()
+
+    def isSolved(self):
+        """every cell is either a mine or visible"""
+        return (self.mines | self.visible) == self.full
+
+    def getCells(self, plane):
+        """returns the set of (x, y) cells, whose bits are set in the plane"""
+        cells = set()
+        data = plane.to_bytes((self.width * self.height + 7) // 8, 'little')
+        for (byteIndex, byte) in enumerate(data):
+            if not byte:
+                continue
+            for bit in range(8):
+                if byte >> bit & 1:
+                    (y, x) = divmod(byteIndex * 8 + bit, self.width)
+                    cells.add((x, y))
+        return cells
+
+    def floodFill(self, x, y):
+        """uncovers x, y and if it has no neighbouring mines the whole
+        connected empty region including its numbered border
+        returns the set of newly revealed cells
+        """
+        if not self.validLocation(x, y) or self.isVisible(x, y):
+            return set()
+        return self.revealPlane(1 << (y * self.width + x))
+
+    def revealMany(self, cells):
+        """flood fills from all passed (x, y) cells at once, they must not contain mines
+        returns the combined set of newly revealed cells
+        """
+        seeds = 0
+        for (x, y) in cells:
+            if self.validLocation(x, y):
+                seeds |= 1 << (y * self.width + x)
+        return self.revealPlane(seeds)
+
+    def revealPlane(self, seeds):
+        """reveals the seed cells and the empty regions connected to them including their numbered border
+        all regions are grown together, one ring of cells per step on the planes
+        returns the set of newly revealed cells
+        """
+        hidden = self.full & ~self.visible
+        seeds &= hidden
+        empty = hidden & ~self.mines
+        for plane in self.counts:
+            empty &= ~plane
+
+        # grow the regions inside the empty cells, then add their numbered border
+        region = seeds & empty
+        if region:
+            while True:
+                grown = (self.dilate(region) & empty) | region
+                if grown == region:
+                    break
+                region = grown
+            region = self.dilate(region) & hidden
+        region |= seeds
+
+        # reveal the region and remove its flags
+        if not self.dirty:
+            self.dirtyCells.update(self.getCells(region))
+        self.visible |= region
+        self.visibleCount += popcount(region)
+        self.flagCount -= popcount(self.flags & region)
+        self.flags &= ~region
+        return self.getCells(region)
+
+    def snapshot(self):
+        """returns the board as bytes, the counts are not stored since they follow from the mines"""
+        planeSize = (self.width * self.height + 7) // 8
+        return SNAPSHOT_HEADER.pack(self.width, self.height) + b''.join(
+            plane.to_bytes(planeSize, 'little') for plane in (self.mines, self.visible, self.flags))
+
+    @classmethod
+    def fromSnapshot(cls, data, cellSize=CELL_SIZE):
+        """creates a board from the bytes returned by snapshot"""
+        (width, height) = SNAPSHOT_HEADER.unpack_from(data)
+        planeSize = (width * height + 7) // 8
+        planes = [int.from_bytes(data[SNAPSHOT_HEADER.size + i * planeSize:SNAPSHOT_HEADER.size + (i + 1) * planeSize], 'little')
+                  for i in range(3)]
+
+        board = cls(width, height, cellSize)
+        (board.mines, board.visible, board.flags) = planes
+        board.mineCount = popcount(board.mines)
+        board.visibleCount = popcount(board.visible)
+        board.flagCount = popcount(board.flags)
+        board.computeMineCounts()
+        return board
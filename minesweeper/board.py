@@ -1,6 +1,13 @@
+import bisect
 import random
+import itertools
 import pygame
 
+try:
+    import numpy
+except ImportError:  # the array backend is optional
+    numpy = None
+
 # colors
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
@@ -18,16 +25,131 @@ FLAG_COLOR = BLUE
 
 # map representation
 # 0-8 mine count of the neighbourhood
+COUNT = 15      # mine count bits
 VISIBLE = 16    # visible bit
 MINE = 32       # bomb bit
 FLAG = 64       # flag bit
 
+# cell value -> byte tables of the mine count pass
+MINE_BYTES = bytes(1 if value & MINE else 0 for value in range(256))
+NO_COUNT_BYTES = bytes(value & ~COUNT for value in range(256))
+
 # screen position constants
 CELL_SIZE = 20
 
 # game constants
 MINE_CHANCE = 0.05
 
+# text constants, the font size scales with the cell size
+FONT_NAME = 'freesansbold.ttf'
+FONT_SIZE = 18  # at CELL_SIZE
+MIN_FONT_SIZE = 6
+TEXT_COLOR = BLACK
+
+# atlas tiles, one pre-rendered cell for every look a cell can have
+HIDDEN_TILE = 0
+MINE_TILE = 1
+FLAG_TILE = 2
+COUNT_TILE = 3  # followed by one tile per mine count
+TILE_COUNT = COUNT_TILE + COUNT + 1
+ATLAS_MARGIN = 1  # unused pixels left of the tiles, blits between 16 byte aligned rows take a much slower path
+
+# glyph atlases by (cell size, text color), shared by all boards of the process
+ATLASES = {}
+
+
+def getTileIndex(value):
+    """returns the atlas tile showing a cell with the passed value"""
+    if value & FLAG:  # todo: implement flag handling
+        return FLAG_TILE
+    if not value & VISIBLE:
+        return HIDDEN_TILE
+    if value & MINE:  # TODO: we uncovered a bomb --> game over
+        return MINE_TILE
+    return COUNT_TILE + (value & COUNT)
+
+
+def getGlyphAtlas(cellSize=CELL_SIZE, color=TEXT_COLOR):
+    """returns the atlas for the cell size and text color, it is rendered on the first request"""
+    key = (cellSize, color)
+    if key not in ATLASES:
+        ATLASES[key] = GlyphAtlas(cellSize, color)
+    return ATLASES[key]
+
+
+class GlyphAtlas:
+    """"all cell tiles of one cell size rendered side by side on a single surface
+
+    cells are drawn by blitting their tile from the atlas, so a whole
+    frame is one Surface.blits call instead of rects, lines and text per cell
+    """
+
+    def __init__(self, cellSize, color):
+        self.cellSize = cellSize
+        self.surface = pygame.Surface((ATLAS_MARGIN + cellSize * TILE_COUNT, cellSize))
+        if pygame.display.get_surface() is not None:  # blits are faster in the display format
+            self.surface = self.surface.convert()
+
+        # render the tiles
+        self.areas = [pygame.Rect(ATLAS_MARGIN + tile * cellSize, 0, cellSize, cellSize) for tile in range(TILE_COUNT)]
+        self.surface.fill(HIDDEN_COLOR, self.areas[HIDDEN_TILE])
+        self.surface.fill(MINE_COLOR, self.areas[MINE_TILE])
+        self.surface.fill(FLAG_COLOR, self.areas[FLAG_TILE])
+        self.drawCounts(color)
+        for area in self.areas:  # top and left grid lines
+            pygame.draw.line(self.surface, BLACK, area.topleft, (area.left, area.bottom - 1))
+            pygame.draw.line(self.surface, BLACK, area.topleft, (area.right - 1, area.top))
+
+        # tile area by cell value
+        self.tiles = [self.areas[getTileIndex(value)] for value in range(FLAG * 2)]
+
+    def drawCounts(self, color):
+        """renders the mine counts, counts that do not fit into small cells are left out"""
+        fontSize = FONT_SIZE * self.cellSize // CELL_SIZE
+        font = None
+        if fontSize >= MIN_FONT_SIZE:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = pygame.font.Font(FONT_NAME, fontSize)
+
+        for mineCount in range(COUNT + 1):
+            area = self.areas[COUNT_TILE + mineCount]
+            self.surface.fill(VISIBLE_COLOR, area)
+            if font is None or not mineCount:
+                continue
+            textSurface = font.render('%s' % mineCount, True, color)
+            if textSurface.get_width() <= area.width:
+                self.surface.blit(textSurface, area)
+
+    def drawCells(self, surface, cells):
+        """draws the (position, value) cells onto the surface in a single blits call"""
+        surface.blits([(self.surface, position, self.tiles[value]) for (position, value) in cells], False)
+
+
+def countMineRows(getRow, width, height):
+    """yields y and the values of row y with the neighbourhood mine count in the count bits, for every row
+    a row is summed as a single int with one byte per cell, the at most 9 mines of a cell never carry
+    into the next byte, so every row costs a few int operations instead of a loop over its cells.
+    the rows are read before the ones above them are yielded, so they can be written back right away
+    """
+    rowMask = (1 << (8 * width)) - 1
+
+    def readRow(y):
+        if y >= height:
+            return b'', 0, 0
+        values = bytes(getRow(y))
+        mines = int.from_bytes(values.translate(MINE_BYTES), 'big')
+        return values, mines, mines + (mines >> 8) + ((mines << 8) & rowMask)
+
+    above = 0
+    (values, mines, current) = readRow(0)
+    for y in range(height):
+        (nextValues, nextMines, below) = readRow(y + 1)
+        counts = above + current + below - mines
+        row = int.from_bytes(values.translate(NO_COUNT_BYTES), 'big') + counts
+        yield y, list(row.to_bytes(width, 'big'))
+        (above, values, mines, current) = (current, nextValues, nextMines, below)
+
 
 def createRandomBoard(windowWidth, windowHeight):
     maxX = int(windowWidth / CELL_SIZE)
@@ -37,11 +159,14 @@ def createRandomBoard(windowWidth, windowHeight):
     return createBoard(maxX, maxY, random.randint(10, 25))
 
 
-def createBoard(width, height, mineCount=None, flagLimit=None):
-    board = Board(width, height)
-
-    # make sure that their is enough slots for the requested bombCount
-    assert (width * height) >= mineCount, 'not enough space on the board for all these bombs'
+def createBoard(width, height, mineCount=None, flagLimit=None, boardType=None, seed=None, safeCell=None):
+    """creates a board with randomly distributed mines
+    the same seed always creates the same board, the neighbourhood
+    of the optional safeCell (x, y) never contains a mine
+    """
+    if boardType is None:
+        boardType = Board
+    board = boardType(width, height)
 
     # fill the board
     if mineCount is None:
@@ -50,12 +175,8 @@ def createBoard(width, height, mineCount=None, flagLimit=None):
     if flagLimit is None:  # limit to the amount of nodes :)
         flagLimit = int(width * height) # todo: process flagLimit and mineCount
 
-    # distribute mines randomly
-    planted = 0
-    while planted < mineCount:
-        (x, y) = board.getRandomPosition()
-        if board.setMine(x, y):
-            planted += 1
+    # distribute mines randomly, this also counts the neighbouring mines of every cell
+    board.plantMines(mineCount, seed, safeCell)
 
     # done return the finished board
     return board
@@ -70,28 +191,29 @@ class Board:
         self.height = height
         self.width = width
         # self.m = [height][width]
-        self.m = [[0 for x in range(0, width)] for y in range(0, height)]
-        self.dirty = True
+        self.m = self.createMatrix(width, height)
+        self.dirty = True  # the whole board needs to be repainted
+        self.dirtyCells = set()  # cells that changed since the last draw
 
         # create output params
+        # the surface is created on the first draw
+        # so that big boards can be used without a display
         self.CELL_WIDTH = cellSize
         self.CELL_HEIGHT = cellSize
-        self.surface = pygame.Surface((width * self.CELL_WIDTH, height * self.CELL_HEIGHT))
+        self.surface = None
         self.rect = pygame.Rect(0, 0, width * self.CELL_WIDTH, height * self.CELL_HEIGHT)
 
-        # create the text once
-        font = pygame.font.Font('freesansbold.ttf', 18)
-        self.values = []
-        for i in range(0, 10, 1):
-            textSurface = font.render('%s' % i, True, BLACK)
-            self.values.append(textSurface)
-
         # accounting
         self.visibleCount = 0
         self.mineCount = 0
         self.flagCount = 0
+        self.lastRevealed = set()  # cells revealed by the last uncover
 
 
+    def createMatrix(self, width, height):
+        """creates the cell storage, one int per cell"""
+        return [[0 for x in range(0, width)] for y in range(0, height)]
+
     def get(self, x, y):
         """returns the node at board position x, y
         if the position is not valid we return False
@@ -108,10 +230,32 @@ class Board:
         if not self.validLocation(x, y):
             return False
 
-        self.dirty = True
+        if not self.dirty:  # a pending full repaint covers the cell
+            self.dirtyCells.add((x, y))
         self.m[y][x] |= bits
         return True
 
+    def _clear(self, x, y, bits):
+        """removes the passed bits from the board value at position x, y
+        returns False if the position is not valid
+        returns True if the operation was successful"""
+        if not self.validLocation(x, y):
+            return False
+
+        if not self.dirty:  # a pending full repaint covers the cell
+            self.dirtyCells.add((x, y))
+        self.m[y][x] &= ~bits
+        return True
+
+    def getRow(self, y):
+        """returns a copy of the cell values of row y"""
+        return list(self.m[y])
+
+    def getRegion(self, x, y, width, height):
+        """returns the cell values of the width x height region at x, y
+        as a list of rows, the region is clipped to the board"""
+        return [list(row[max(x, 0):x + width]) for row in self.m[max(y, 0):y + height]]
+
     def setMineCount(self, x, y, mineCount):
         return self._set(x, y, mineCount)
 
@@ -148,117 +292,358 @@ class Board:
         return False
 
     def removeFlag(self, x, y):
-        if not self.hasFlag(x, y):
+        if not self.hasFlag(x, y) or not self._clear(x, y, FLAG):
             return False
-        self.m[y][x] &= ~FLAG
-        self.dirty = True
         self.flagCount -= 1
         return True
 
     def getRandomPosition(self):
-        return random.randint(0, self.width), random.randint(0, self.height)
+        return random.randint(0, self.width - 1), random.randint(0, self.height - 1)
+
+    def sampleMineCells(self, mineCount, seed=None, safeCell=None):
+        """samples mineCount distinct cells without replacement in a single pass
+        over the board without the neighbourhood of safeCell
+        returns the sample indices and the shift table,
+        see getMinePositions for mapping them back to the board
+        """
+        excluded = []
+        if safeCell is not None:
+            (safeX, safeY) = safeCell
+            excluded = sorted((safeY + yOffset) * self.width + safeX + xOffset
+                              for yOffset in range(-1, 2, 1)
+                              for xOffset in range(-1, 2, 1)
+                              if self.validLocation(safeX + xOffset, safeY + yOffset))
+
+        # make sure that their is enough slots for the requested bombCount
+        cellCount = self.width * self.height - len(excluded)
+        assert cellCount >= mineCount, 'not enough space on the board for all these bombs'
+
+        rng = random.Random(seed)
+        if mineCount <= cellCount // 2:
+            samples = rng.sample(range(cellCount), mineCount)
+        else:  # dense boards sample the free cells instead, so the cost stays the same
+            mines = bytearray(b'\x01') * cellCount
+            for index in rng.sample(range(cellCount), cellCount - mineCount):
+                mines[index] = 0
+            samples = list(itertools.compress(range(cellCount), mines))
+
+        # a sample moves up by one for every excluded index i with excluded[i] - i <= sample
+        shifted = [index - i for (i, index) in enumerate(excluded)]
+        return samples, shifted
+
+    def getMinePositions(self, mineCount, seed=None, safeCell=None):
+        """returns mineCount distinct flat cell indices (y * width + x)
+        the same seed always returns the same positions,
+        the neighbourhood of safeCell is left out
+        """
+        (samples, shifted) = self.sampleMineCells(mineCount, seed, safeCell)
+        if not shifted:
+            return samples
+        return [index + bisect.bisect_right(shifted, index) for index in samples]
+
+    def plantMines(self, mineCount, seed=None, safeCell=None):
+        """places mineCount mines on the empty board and counts the neighbouring mines of every cell"""
+        for index in self.getMinePositions(mineCount, seed, safeCell):
+            (y, x) = divmod(index, self.width)
+            self.m[y][x] |= MINE
+        self.mineCount += mineCount
+        self.computeMineCounts()
 
     def validLocation(self, x, y):
         return 0 <= x < self.width and 0 <= y < self.height
 
+    def isSolved(self):
+        """returns True once every cell without a mine is visible"""
+        targetCount = (self.width * self.height) - self.mineCount
+        return self.visibleCount == targetCount
+
     def uncover(self, x, y):
+        self.lastRevealed = set()
         if not self.validLocation(x, y):
             return False
 
         if not self.isVisible(x, y):
-            self.dirty = True
             if self.hasMine(x, y):  # we lose
                 self.setVisible(x, y)
+                self.lastRevealed.add((x, y))
                 return 'mine'
 
             # no mines, so flood fill
-            self.floodFill(x, y)
-            targetCount = (self.width * self.height) - self.mineCount
-            if self.visibleCount == targetCount:
+            self.lastRevealed = self.floodFill(x, y)
+            if self.isSolved():
                 return 'done'
 
         return self.get(x, y)
 
+    def uncoverMany(self, cells):
+        """uncovers all passed (x, y) cells in one step, overlapping flood regions are only filled once
+        returns 'mine' if one of the cells is a mine, 'done' once the board is solved
+        and otherwise the combined set of revealed cells, which is also kept in lastRevealed
+        """
+        self.lastRevealed = set()
+        safe = []
+        mines = []
+        for (x, y) in cells:
+            value = self.get(x, y)
+            if value is False or value & VISIBLE:  # outside of the board or already uncovered
+                continue
+            if value & MINE:
+                mines.append((x, y))
+            else:
+                safe.append((x, y))
+
+        self.lastRevealed = self.revealMany(safe)
+        if mines:  # we lose, the rest of the batch is still revealed
+            for (x, y) in mines:
+                self.setVisible(x, y)
+                self.lastRevealed.add((x, y))
+            return 'mine'
+        if self.isSolved():
+            return 'done'
+        return self.lastRevealed
+
+    def chord(self, x, y):
+        """uncovers all unflagged neighbours of the visible number x, y
+        if exactly that many of its neighbours are flagged
+        returns False if the cell can not be chorded, otherwise the result of uncoverMany
+        """
+        self.lastRevealed = set()
+        value = self.get(x, y)
+        if value is False or not value & VISIBLE or value & MINE or not value & COUNT:
+            return False
+
+        neighbours = [(x + xOffset, y + yOffset)
+                      for yOffset in range(-1, 2, 1)
+                      for xOffset in range(-1, 2, 1)
+                      if (xOffset or yOffset) and self.validLocation(x + xOffset, y + yOffset)]
+        flags = [cell for cell in neighbours if self.hasFlag(*cell)]
+        if len(flags) != value & COUNT:
+            return False
+        return self.uncoverMany(cell for cell in neighbours if not self.hasFlag(*cell))
+
     def countMines(self, x, y):
+        """returns the precomputed mine count of the neighbourhood of x, y"""
         if not self.validLocation(x, y):
             return False
+        return self.get(x, y) & COUNT
 
-        mineCount = 0
-        for yOffset in range(-1, 2, 1):
-            for xOffset in range(-1, 2, 1):
-                if (x + xOffset == x) and (y + yOffset == y):
-                    continue
-                if self.hasMine(x + xOffset, y + yOffset):
-                    mineCount += 1
+    def computeMineCounts(self):
+        """stores the neighbourhood mine count of every cell in its count bits
+        this is done in a single pass over the rows, see countMineRows
+        needs to be called again after placing mines
+        """
+        for (y, row) in countMineRows(self.getRow, self.width, self.height):
+            self.m[y] = row
+        self.dirty = True
 
-        return mineCount
+    def isHiddenZero(self, x, y):
+        """returns True if x, y is a hidden cell without neighbouring mines"""
+        value = self.get(x, y)
+        return value is not False and not value & (VISIBLE | MINE | COUNT)
+
+    def revealCell(self, x, y, revealed):
+        """makes the cell visible, removes its flag and records it in revealed"""
+        value = self.get(x, y)
+        if value & VISIBLE or not self._set(x, y, VISIBLE):
+            return
+        self.visibleCount += 1
+        if value & FLAG:
+            self._clear(x, y, FLAG)
+            self.flagCount -= 1
+        revealed.add((x, y))
+
+    def revealMany(self, cells):
+        """flood fills from every passed (x, y) cell without a mine
+        returns the combined set of newly revealed cells
+        """
+        revealed = set()
+        for (x, y) in cells:
+            revealed |= self.floodFill(x, y)  # cells filled by an earlier seed are skipped
+        return revealed
 
     def floodFill(self, x, y):
-        # only process valid locations
-        if not self.validLocation(x, y):
-            return 0
-
-        # we only process nodes that we have not visited before
-        # since visible internally checks isValidLocation
-        # it could return false, therefore we require
-        # an explicit check of isValidLocation at the method entry
-        if self.isVisible(x, y):
-            return 0
-
-        # process cell
-        self.setVisible(x, y)
-        self.removeFlag(x, y)
-        visited = 1
-        mineCount = self.countMines(x, y)
-        if mineCount > 0:  # set count and stop
-            self.setMineCount(x, y, mineCount)
-        else:  # flood fill neighbours
-            for yOffset in range(-1, 2, 1):
-                for xOffset in range(-1, 2, 1):
-                    if (x + xOffset == x) and (y + yOffset == y):
-                        continue
-                    visited += self.floodFill(x + xOffset, y + yOffset)
-
-        # return how many nodes we uncovered
-        return visited
-
-    def drawMineCount(self, surface, cellRect, mineCount):
-        surface.blit(self.values[mineCount], cellRect)
+        """uncovers x, y and if it has no neighbouring mines the whole
+        connected empty region including its numbered border
+        the region is filled one horizontal span at a time from a stack of seeds,
+        so there is no recursion and every cell is only visited a few times
+        returns the set of newly revealed cells
+        """
+        revealed = set()
+
+        # only process valid locations, that we have not visited before
+        if not self.validLocation(x, y) or self.isVisible(x, y):
+            return revealed
+
+        # numbered cells and mines stop the fill
+        if not self.isHiddenZero(x, y):
+            self.revealCell(x, y, revealed)
+            return revealed
+
+        seeds = [(x, y)]
+        while seeds:
+            (x, y) = seeds.pop()
+            if self.isVisible(x, y):  # the span was already filled from another seed
+                continue
+
+            # extend the span of empty cells to the left and right
+            left = x
+            while self.isHiddenZero(left - 1, y):
+                left -= 1
+            right = x
+            while self.isHiddenZero(right + 1, y):
+                right += 1
+
+            # reveal the span and its numbered ends
+            spanStart = left - 1 if self.validLocation(left - 1, y) else left
+            spanEnd = right + 1 if self.validLocation(right + 1, y) else right
+            for spanX in range(spanStart, spanEnd + 1):
+                self.revealCell(spanX, y, revealed)
+
+            # reveal the numbered cells above and below the span
+            # and push one seed per run of empty cells
+            for neighbourY in (y - 1, y + 1):
+                if not self.validLocation(x, neighbourY):
+                    continue
+                inRun = False
+                for spanX in range(spanStart, spanEnd + 1):
+                    value = self.get(spanX, neighbourY)
+                    if value & VISIBLE:
+                        inRun = False
+                    elif value & COUNT:
+                        self.revealCell(spanX, neighbourY, revealed)
+                        inRun = False
+                    elif not inRun:
+                        seeds.append((spanX, neighbourY))
+                        inRun = True
+
+        # return the uncovered nodes
+        return revealed
+
+    def initSurface(self):
+        """creates the board surface, in the pixel format of the atlas to keep blits fast"""
+        self.surface = pygame.Surface((self.rect.width, self.rect.height), 0, self.getAtlas().surface)
+        self.dirty = True
+
+    def setViewport(self, x, y, width, height):
+        """tells the board which width x height cell region at x, y is being viewed"""
+        pass
+
+    def save(self, path):
+        """writes the board to path in the bit packed format of minesweeper.savefile"""
+        import minesweeper.savefile  # imported here, since the save file module builds on this one
+        minesweeper.savefile.saveBoard(self, path)
+
+    @staticmethod
+    def load(path, cellSize=CELL_SIZE):
+        """opens a board written by save, the cells are memory mapped and read on demand"""
+        import minesweeper.savefile
+        return minesweeper.savefile.loadBoard(path, cellSize)
+
+    def getCellRect(self, x, y):
+        """returns the rect of the cell x, y on the board surface"""
+        return pygame.Rect(x * self.CELL_WIDTH, y * self.CELL_HEIGHT, self.CELL_WIDTH, self.CELL_HEIGHT)
+
+    def getAtlas(self):
+        """returns the shared glyph atlas for the cell size of the board"""
+        return getGlyphAtlas(self.CELL_WIDTH)
 
     def draw(self):
-        """"draws the board to a separate surface, only updates the surface, when the board has changed"""
-        if not self.dirty:
-            return self.surface, self.rect
-
-        # draw board
-        for y in range(len(self.m)):
-            for x in range(len(self.m[0])):
-                leftPos = x * self.CELL_WIDTH
-                topPos = y * self.CELL_HEIGHT
-                cellRect = pygame.Rect(leftPos, topPos, self.CELL_WIDTH, self.CELL_HEIGHT)
-
-                if not self.isVisible(x, y):
-                    pygame.draw.rect(self.surface, HIDDEN_COLOR, cellRect)
-                else:
-                    pygame.draw.rect(self.surface, VISIBLE_COLOR, cellRect)
-                    mineCount = self.m[y][x] & ~(FLAG | MINE | VISIBLE)
-                    if mineCount:
-                        self.drawMineCount(self.surface, cellRect, mineCount)
-                    if self.hasMine(x, y):  # TODO: we uncovered a bomb --> game over
-                        pygame.draw.rect(self.surface, MINE_COLOR, cellRect)
-
-                # todo: implement flag handling
-                if self.hasFlag(x, y):
-                    pygame.draw.rect(self.surface, FLAG_COLOR, cellRect)
-
-        # draw grid lines
-        for x in range(0, self.rect.width, self.CELL_WIDTH):  # draw vertical line
-            pygame.draw.line(self.surface, BLACK, (x, 0), (x, self.rect.height))
-        for y in range(0, self.rect.height, self.CELL_HEIGHT):  # draw horizontal line
-            pygame.draw.line(self.surface, BLACK, (0, y), (self.rect.width, y))
-
-        # done return the surface and rect
-        return self.surface, self.rect
+        """"draws the board to a separate surface, only repaints the cells that changed since the last draw
+        returns the surface, its rect and the list of changed rects on the surface
+        """
+        if self.surface is None:
+            self.initSurface()
+        atlas = self.getAtlas()
+
+        # repaint the whole board
+        if self.dirty:
+            atlas.drawCells(self.surface, (((x * self.CELL_WIDTH, y * self.CELL_HEIGHT), value)
+                                           for y in range(self.height)
+                                           for (x, value) in enumerate(self.getRow(y))))
+            self.dirty = False
+            self.dirtyCells.clear()
+            return self.surface, self.rect, [self.surface.get_rect()]
+
+        # repaint only the changed cells
+        changedRects = [self.getCellRect(x, y) for (x, y) in self.dirtyCells]
+        atlas.drawCells(self.surface, [(cellRect.topleft, self.get(x, y))
+                                       for (cellRect, (x, y)) in zip(changedRects, self.dirtyCells)])
+        self.dirtyCells.clear()
+
+        # done return the surface, rect and changed areas
+        return self.surface, self.rect, changedRects
+
+
+class ArrayBoard(Board):
+    """"a board that keeps all cells in a single uint8 numpy array
+    this uses one byte per cell, and allows for fast row and region reads
+    """
+
+    def __init__(self, width, height, cellSize=CELL_SIZE):
+        assert numpy is not None, 'the array board requires numpy'
+        Board.__init__(self, width, height, cellSize)
 
+    def createMatrix(self, width, height):
+        """creates the cell storage, one byte per cell"""
+        return numpy.zeros((height, width), dtype=numpy.uint8)
 
+    def get(self, x, y):
+        if not self.validLocation(x, y):
+            return False
+        return self.m.item(y, x)
+
+    def _set(self, x, y, bits):
+        if not self.validLocation(x, y):
+            return False
+
+        if not self.dirty:  # a pending full repaint covers the cell
+            self.dirtyCells.add((x, y))
+        self.m[y, x] |= bits
+        return True
+
+    def _clear(self, x, y, bits):
+        if not self.validLocation(x, y):
+            return False
+
+        if not self.dirty:  # a pending full repaint covers the cell
+            self.dirtyCells.add((x, y))
+        self.m[y, x] &= ~bits & 0xFF
+        return True
+
+    def plantMines(self, mineCount, seed=None, safeCell=None):
+        """places mineCount mines on the empty board and counts the neighbouring mines of every cell"""
+        (samples, shifted) = self.sampleMineCells(mineCount, seed, safeCell)
+        positions = numpy.array(samples, dtype=numpy.int64)
+        positions += numpy.searchsorted(numpy.array(shifted, dtype=numpy.int64), positions, side='right')
+        self.m.reshape(-1)[positions] |= MINE
+        self.mineCount += mineCount
+        self.computeMineCounts()
+
+    def computeMineCounts(self):
+        """stores the neighbourhood mine count of every cell in its count bits
+        the counts are the sum of the 8 shifted mine planes
+        """
+        mines = (self.m & MINE) >> 5
+        padded = numpy.pad(mines, 1)
+        counts = numpy.zeros_like(mines)
+        for yOffset in range(0, 3):
+            for xOffset in range(0, 3):
+                if xOffset == 1 and yOffset == 1:
+                    continue
+                counts += padded[yOffset:yOffset + self.height, xOffset:xOffset + self.width]
+        self.m &= ~COUNT & 0xFF
+        self.m |= counts
+        self.dirty = True
 
+    def getRow(self, y):
+        """returns a read only view of the cell values of row y"""
+        row = self.m[y]
+        row.flags.writeable = False
+        return row
+
+    def getRegion(self, x, y, width, height):
+        """returns a read only view of the width x height region at x, y
+        the region is clipped to the board"""
+        region = self.m[max(y, 0):y + height, max(x, 0):x + width]
+        region.flags.writeable = False
+        return region
@@ -0,0 +1,206 @@
+import math
+import pygame
+import minesweeper.overview
+
+from minesweeper.board import BACKGROUND_COLOR, CELL_SIZE, getGlyphAtlas, numpy
+
+# zoom limits, in pixels per cell
+MIN_CELL_SIZE = 2  # smallest cell size drawn with the atlas, below that the overview is shown
+MAX_CELL_SIZE = 64
+MIN_SCALE = 0.5 ** minesweeper.overview.MAX_LEVEL
+
+
+def getZoom(scale):
+    """returns the (cellSize, level) for a scale in pixels per cell
+    scales below MIN_CELL_SIZE are shown by the overview with one pixel per 2^level x 2^level cells
+    """
+    if scale >= MIN_CELL_SIZE:
+        return int(round(scale)), 0
+    return 1, max(0, int(math.ceil(-math.log(scale, 2) - 1e-9)))
+
+
+class Camera:
+    """"the part of the board that is shown in the view rect of the screen
+
+    the camera position is the board pixel at the top left of the view,
+    at the current zoom, where a cell is cellSize pixels wide, or one pixel
+    covers 2^level cells once zoomed out into the overview. only the cells that
+    intersect the view are drawn, so the cost of a frame depends on the view size
+    and not the board size
+    """
+
+    def __init__(self, viewRect, cellSize=CELL_SIZE):
+        self.viewRect = pygame.Rect(viewRect)
+        self.scale = float(cellSize)
+        self.cellSize = cellSize
+        self.level = 0
+        self.x = 0
+        self.y = 0
+        self.moved = True  # the whole view needs to be repainted
+        self.overview = None  # created on the first zoomed out draw
+
+    def isOverview(self):
+        return self.cellSize < MIN_CELL_SIZE
+
+    def screenToBoard(self, screenX, screenY):
+        """returns the board cell under the screen position"""
+        boardX = ((screenX - self.viewRect.left + self.x) << self.level) // self.cellSize
+        boardY = ((screenY - self.viewRect.top + self.y) << self.level) // self.cellSize
+        return boardX, boardY
+
+    def boardToScreen(self, boardX, boardY):
+        """returns the screen position of the top left corner of the board cell"""
+        return (self.viewRect.left + ((boardX * self.cellSize) >> self.level) - self.x,
+                self.viewRect.top + ((boardY * self.cellSize) >> self.level) - self.y)
+
+    def getVisibleCells(self):
+        """returns the x, y, width, height of the cell region intersecting the view"""
+        firstX = (self.x << self.level) // self.cellSize
+        firstY = (self.y << self.level) // self.cellSize
+        lastX = (((self.x + self.viewRect.width) << self.level) - 1) // self.cellSize
+        lastY = (((self.y + self.viewRect.height) << self.level) - 1) // self.cellSize
+        return firstX, firstY, lastX - firstX + 1, lastY - firstY + 1
+
+    def centerOn(self, boardX, boardY):
+        """moves the camera so that the board cell is in the center of the view"""
+        self.moveTo(((boardX * self.cellSize + self.cellSize // 2) >> self.level) - self.viewRect.width // 2,
+                    ((boardY * self.cellSize + self.cellSize // 2) >> self.level) - self.viewRect.height // 2)
+
+    def moveTo(self, x, y):
+        if (x, y) != (self.x, self.y):
+            self.x, self.y = x, y
+            self.moved = True
+
+    def pan(self, dx, dy):
+        """moves the view by dx, dy screen pixels"""
+        self.moveTo(self.x + dx, self.y + dy)
+
+    def zoom(self, factor, anchor=None):
+        """scales the view by factor, keeping the board position under the anchor
+        screen position in place, the center of the view is used by default
+        """
+        self.scale = max(MIN_SCALE, min(MAX_CELL_SIZE, self.scale * factor))
+        (cellSize, level) = getZoom(self.scale)
+        if (cellSize, level) == (self.cellSize, self.level):
+            return
+        if anchor is None:
+            anchor = self.viewRect.center
+
+        # position of the anchor in the view and on the board, in cells
+        anchorX, anchorY = anchor[0] - self.viewRect.left, anchor[1] - self.viewRect.top
+        pixelCells = float(2 ** self.level) / self.cellSize
+        boardX, boardY = (self.x + anchorX) * pixelCells, (self.y + anchorY) * pixelCells
+        self.cellSize, self.level = cellSize, level
+        pixelCells = float(2 ** level) / cellSize
+        self.moveTo(int(boardX / pixelCells) - anchorX, int(boardY / pixelCells) - anchorY)
+        self.moved = True
+
+    def clamp(self, board):
+        """keeps the view inside bounded boards, boards that are smaller than the view stay at the top left
+        boards without an overview can not be zoomed out below MIN_CELL_SIZE
+        """
+        if (not board.width or numpy is None) and self.scale < MIN_CELL_SIZE:
+            self.zoom(MIN_CELL_SIZE / self.scale)
+        if not board.width:
+            return
+        maxX = ((board.width * self.cellSize) >> self.level) - self.viewRect.width
+        maxY = ((board.height * self.cellSize) >> self.level) - self.viewRect.height
+        self.moveTo(max(0, min(self.x, maxX)), max(0, min(self.y, maxY)))
+
+    def getCellRect(self, boardX, boardY):
+        """returns the screen rect of the board cell"""
+        (left, top) = self.boardToScreen(boardX, boardY)
+        return pygame.Rect(left, top, self.cellSize, self.cellSize)
+
+    def draw(self, board, surface, heatmap=None):
+        """draws the visible part of the board onto the surface,
+        with the shades of the optional heatmap on top
+        returns the list of changed screen rects
+        """
+        self.updateOverview(board)
+        surface.set_clip(self.viewRect)
+        if self.isOverview():
+            changedRects = []
+            if self.moved or board.dirty or board.dirtyCells:
+                changedRects = [self.drawOverview(board, surface)]
+        elif self.moved or board.dirty:
+            changedRects = [self.drawView(board, surface, getGlyphAtlas(self.cellSize), heatmap)]
+        else:
+            # repaint only the changed cells that are in view
+            changedRects = []
+            cells = []
+            for (x, y) in board.dirtyCells:
+                cellRect = self.getCellRect(x, y)
+                if cellRect.colliderect(self.viewRect):
+                    cells.append((cellRect.topleft, x, y, board.get(x, y)))
+                    changedRects.append(cellRect.clip(self.viewRect))
+            self.drawCells(surface, getGlyphAtlas(self.cellSize), heatmap, cells)
+        self.moved = False
+        board.dirty = False
+        board.dirtyCells.clear()
+        surface.set_clip(None)
+        return changedRects
+
+    def updateOverview(self, board):
+        """keeps the overview of the board in sync with the changes since the last draw
+        full repaints only mark it, it is computed again when it is shown
+        """
+        if self.overview is not None and self.overview.board is not board:
+            self.overview = None
+        if self.overview is None:
+            if self.isOverview():
+                self.overview = minesweeper.overview.Overview(board)
+            return
+
+        if board.dirty:
+            self.overview.stale = True
+        else:
+            self.overview.update(board.dirtyCells)
+        if self.isOverview() and self.overview.stale:
+            self.overview.rebuild()
+
+    def drawOverview(self, board, surface):
+        """copies the visible part of the overview level to the view and returns the view rect"""
+        surface.fill(BACKGROUND_COLOR, self.viewRect)
+        (firstX, firstY, width, height) = self.getVisibleCells()
+        board.setViewport(firstX, firstY, width, height)
+        self.overview.draw(surface, self.viewRect.topleft, self.level,
+                           self.x, self.y, self.viewRect.width, self.viewRect.height)
+        return self.viewRect
+
+    def drawView(self, board, surface, atlas, heatmap):
+        """repaints every cell in the view and returns the view rect"""
+        surface.fill(BACKGROUND_COLOR, self.viewRect)
+        (firstX, firstY, width, height) = self.getVisibleCells()
+        board.setViewport(firstX, firstY, width, height)
+
+        # only read the cells that are on the board
+        if board.width:
+            lastX, lastY = min(firstX + width, board.width), min(firstY + height, board.height)
+            firstX, firstY = max(firstX, 0), max(firstY, 0)
+            width, height = lastX - firstX, lastY - firstY
+        if width <= 0 or height <= 0:
+            return self.viewRect
+
+        # read the visible cells in one go
+        rows = board.getRegion(firstX, firstY, width, height)
+        if hasattr(rows, 'tolist'):  # array regions are converted to plain ints
+            rows = rows.tolist()
+
+        (left, top) = self.boardToScreen(firstX, firstY)
+        size = self.cellSize
+        if heatmap is None:
+            atlas.drawCells(surface, (((left + x * size, top + y * size), value)
+                                      for (y, row) in enumerate(rows)
+                                      for (x, value) in enumerate(row)))
+        else:
+            self.drawCells(surface, atlas, heatmap, [((left + x * size, top + y * size), firstX + x, firstY + y, value)
+                                                     for (y, row) in enumerate(rows)
+                                                     for (x, value) in enumerate(row)])
+        return self.viewRect
+
+    def drawCells(self, surface, atlas, heatmap, cells):
+        """draws the ((screenX, screenY), x, y, value) cells and their heatmap shades"""
+        atlas.drawCells(surface, [(position, value) for (position, x, y, value) in cells])
+        if heatmap is not None:
+            heatmap.drawShades(surface, self.cellSize, cells)
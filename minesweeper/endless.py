@@ -0,0 +1,215 @@
+import random
+import zlib
+import collections
+import minesweeper.board
+
+from minesweeper.board import MINE, VISIBLE, FLAG, CELL_SIZE
+
+# chunk sizes
+CHUNK_SIZE = 32
+CHUNK_CELLS = CHUNK_SIZE * CHUNK_SIZE
+
+# cache sizes, in chunks
+CACHE_SIZE = 256
+LAYOUT_CACHE_SIZE = 1024
+
+# game constants
+# below ~10% mines the empty regions percolate, so a single click would never stop uncovering
+MINE_CHANCE = 0.2
+MIN_MINE_CHANCE = 0.1
+
+# the player state of a cell, everything else can be generated again from the seed
+STATE = VISIBLE | FLAG
+STATE_TABLE = bytes(value & STATE for value in range(256))
+
+# neighbour offset -> (first cell, last cell + 1, position in the padded chunk)
+# of the cells of a neighbouring chunk, that border the chunk
+BORDER_SPANS = {-1: (CHUNK_SIZE - 1, CHUNK_SIZE, 0),
+                0: (0, CHUNK_SIZE, 1),
+                1: (0, 1, CHUNK_SIZE + 1)}
+
+
+class EndlessBoard(minesweeper.board.Board):
+    """"a board without borders, which is generated lazily in fixed size chunks
+
+    the mines of a chunk are derived from the seed and the chunk position,
+    so chunks can be thrown away and generated again at any time.
+    the loaded chunks are kept in a lru cache, chunks with player state
+    are compressed down to their visible and flag bits when they are evicted,
+    chunks inside the viewport are never evicted
+    """
+
+    def __init__(self, seed=None, mineChance=MINE_CHANCE, cellSize=CELL_SIZE, cacheSize=CACHE_SIZE):
+        assert mineChance > MIN_MINE_CHANCE, 'not enough mines, the empty regions would never end'
+        minesweeper.board.Board.__init__(self, 0, 0, cellSize)
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.mineChance = mineChance
+        self.cacheSize = cacheSize
+
+        # (chunkX, chunkY) -> bytearray of CHUNK_CELLS cells, in lru order
+        self.chunks = collections.OrderedDict()
+        # (chunkX, chunkY) -> bytes of CHUNK_CELLS mine bits, in lru order
+        self.mineLayouts = collections.OrderedDict()
+        # (chunkX, chunkY) -> zlib compressed player state of evicted chunks
+        self.savedStates = {}
+        # chunks inside the viewport
+        self.pinnedChunks = set()
+        # x, y, width, height of the viewport, the span of a row read
+        self.viewport = (0, 0, CHUNK_SIZE, CHUNK_SIZE)
+
+    def createMatrix(self, width, height):
+        """the cells are stored in chunks"""
+        return None
+
+    def validLocation(self, x, y):
+        return True
+
+    def isSolved(self):
+        """an endless board can not be solved"""
+        return False
+
+    def locate(self, x, y):
+        """returns the chunk containing x, y and the index of the cell inside the chunk"""
+        (chunkX, cellX) = divmod(x, CHUNK_SIZE)
+        (chunkY, cellY) = divmod(y, CHUNK_SIZE)
+        return self.getChunk(chunkX, chunkY), cellY * CHUNK_SIZE + cellX
+
+    def get(self, x, y):
+        (chunk, index) = self.locate(x, y)
+        return chunk[index]
+
+    def _set(self, x, y, bits):
+        (chunk, index) = self.locate(x, y)
+        if not self.dirty:  # a pending full repaint covers the cell
+            self.dirtyCells.add((x, y))
+        chunk[index] |= bits
+        return True
+
+    def _clear(self, x, y, bits):
+        (chunk, index) = self.locate(x, y)
+        if not self.dirty:  # a pending full repaint covers the cell
+            self.dirtyCells.add((x, y))
+        chunk[index] &= ~bits & 0xFF
+        return True
+
+    def getRow(self, y, x=None, width=None):
+        """returns a copy of the cell values of row y from x on for width cells,
+        an endless row has no end, so it spans the columns of the viewport by default
+        """
+        if x is None:
+            x = self.viewport[0]
+        if width is None:
+            width = self.viewport[2]
+        (chunkY, cellY) = divmod(y, CHUNK_SIZE)
+        row = []
+        regionX = x
+        while regionX < x + width:
+            (chunkX, cellX) = divmod(regionX, CHUNK_SIZE)
+            count = min(CHUNK_SIZE - cellX, x + width - regionX)
+            start = cellY * CHUNK_SIZE + cellX
+            row.extend(self.getChunk(chunkX, chunkY)[start:start + count])
+            regionX += count
+        return row
+
+    def getRegion(self, x, y, width, height):
+        """returns the cell values of the width x height region at x, y as a list of rows"""
+        return [self.getRow(regionY, x, width) for regionY in range(y, y + height)]
+
+    def setViewport(self, x, y, width, height):
+        """pins the chunks that intersect the width x height cell region at x, y
+        so that scrolling back and forth does not regenerate them
+        """
+        self.viewport = (x, y, width, height)
+        firstX, firstY = x // CHUNK_SIZE, y // CHUNK_SIZE
+        lastX, lastY = (x + width - 1) // CHUNK_SIZE, (y + height - 1) // CHUNK_SIZE
+        self.pinnedChunks = {(chunkX, chunkY)
+                             for chunkY in range(firstY, lastY + 1)
+                             for chunkX in range(firstX, lastX + 1)}
+
+    def getChunk(self, chunkX, chunkY):
+        """returns the cells of the chunk, loading it if necessary"""
+        key = (chunkX, chunkY)
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            return chunk
+
+        chunk = self.loadChunk(chunkX, chunkY)
+        self.chunks[key] = chunk
+        self.evictChunks()
+        return chunk
+
+    def loadChunk(self, chunkX, chunkY):
+        """generates the mines and counts of the chunk
+        and restores the player state, if the chunk was evicted before
+        """
+        # mines of the chunk and a one cell border from its neighbours
+        paddedSize = CHUNK_SIZE + 2
+        padded = bytearray(paddedSize * paddedSize)
+        for neighbourY in range(-1, 2):
+            (firstY, lastY, paddedY) = BORDER_SPANS[neighbourY]
+            for neighbourX in range(-1, 2):
+                (firstX, lastX, paddedX) = BORDER_SPANS[neighbourX]
+                layout = self.getMineLayout(chunkX + neighbourX, chunkY + neighbourY)
+                for cellY in range(firstY, lastY):
+                    start = (paddedY + cellY - firstY) * paddedSize + paddedX
+                    padded[start:start + lastX - firstX] = layout[cellY * CHUNK_SIZE + firstX:cellY * CHUNK_SIZE + lastX]
+
+        # count the mines with running sums of three cells
+        tripleSums = []
+        for paddedY in range(paddedSize):
+            row = padded[paddedY * paddedSize:(paddedY + 1) * paddedSize]
+            tripleSums.append([a + b + c for (a, b, c) in zip(row, row[1:], row[2:])])
+
+        chunk = bytearray(CHUNK_CELLS)
+        for cellY in range(CHUNK_SIZE):
+            mines = padded[(cellY + 1) * paddedSize + 1:(cellY + 1) * paddedSize + 1 + CHUNK_SIZE]
+            sums = zip(mines, tripleSums[cellY], tripleSums[cellY + 1], tripleSums[cellY + 2])
+            chunk[cellY * CHUNK_SIZE:(cellY + 1) * CHUNK_SIZE] = bytes(
+                (MINE if mine else 0) | (a + b + c - mine) for (mine, a, b, c) in sums)
+
+        # restore the player state
+        savedState = self.savedStates.pop((chunkX, chunkY), None)
+        if savedState is not None:
+            chunk = bytearray(value | state for (value, state) in zip(chunk, zlib.decompress(savedState)))
+        return chunk
+
+    def getMineLayout(self, chunkX, chunkY):
+        """returns one byte per cell of the chunk, 1 for a mine
+        the layout only depends on the seed and the chunk position
+        """
+        key = (chunkX, chunkY)
+        layout = self.mineLayouts.get(key)
+        if layout is not None:
+            self.mineLayouts.move_to_end(key)
+            return layout
+
+        rng = random.Random('%s:%d:%d' % (self.seed, chunkX, chunkY))
+        layout = bytes(1 if rng.random() < self.mineChance else 0 for i in range(CHUNK_CELLS))
+        self.mineLayouts[key] = layout
+        if len(self.mineLayouts) > LAYOUT_CACHE_SIZE:
+            self.mineLayouts.popitem(last=False)
+        return layout
+
+    def evictChunks(self):
+        """evicts the least recently used chunks outside of the viewport"""
+        if len(self.chunks) <= self.cacheSize:
+            return
+
+        for key in list(self.chunks.keys()):
+            if len(self.chunks) <= self.cacheSize:
+                break
+            if key in self.pinnedChunks:
+                continue
+
+            # only the player state needs to be kept
+            state = self.chunks.pop(key).translate(STATE_TABLE)
+            if state.count(0) < CHUNK_CELLS:
+                self.savedStates[key] = zlib.compress(state)
+
+    def memoryUsage(self):
+        """returns the amount of bytes held by the chunk caches and the saved states"""
+        return (len(self.chunks) * CHUNK_CELLS + len(self.mineLayouts) * CHUNK_CELLS
+                + sum(len(state) for state in self.savedStates.values()))
@@ -3,6 +3,11 @@ import random
 import time
 import pygame
 import minesweeper.board
+import minesweeper.camera
+import minesweeper.endless
+import minesweeper.pool
+import minesweeper.history
+import minesweeper.heatmap
 
 from pygame.locals import *
 
@@ -14,6 +19,12 @@ FPS = 10
 MOUSE_BUTTON_LEFT = 1
 MOUSE_BUTTON_MIDDLE = 2
 MOUSE_BUTTON_RIGHT = 3
+MOUSE_WHEEL_UP = 4
+MOUSE_WHEEL_DOWN = 5
+
+# camera constants
+PAN_STEP = 100  # pixels per key press
+ZOOM_STEP = 1.25
 
 # pixel sizes
 BASIC_FONT_SIZE = 18
@@ -25,6 +36,10 @@ CELL_HEIGHT = int(WINDOW_HEIGHT / CELL_SIZE)
 assert WINDOW_WIDTH % CELL_SIZE == 0, 'Window width must be a multiple of cell size.'
 assert WINDOW_HEIGHT % CELL_SIZE == 0, 'Window height must be a multiple of cell size.'
 
+# board constants
+MINE_COUNT = 25
+POOL_TIMEOUT = 1.0  # seconds to wait for a no guess board, before falling back to a random one
+
 # color
 BLACK = (0, 0, 0)
 RED = (255, 0, 0)
@@ -35,9 +50,14 @@ BACKGROUND_COLOR = BLACK
 DISPLAY_SURFACE = None
 BASIC_FONT = None
 FPS_CLOCK = None
+BOARD_POOL = None
 
 def main():
-    global DISPLAY_SURFACE, FPS_CLOCK, BASIC_FONT
+    global DISPLAY_SURFACE, FPS_CLOCK, BASIC_FONT, BOARD_POOL
+
+    # start generating no guess boards, before the display is opened in this process
+    BOARD_POOL = minesweeper.pool.BoardPool(CELL_WIDTH, CELL_HEIGHT, MINE_COUNT,
+                                            boardType=minesweeper.history.TiledBoard)
 
     # init pygame
     pygame.init()
@@ -48,8 +68,9 @@ def main():
 
     # todo: implement real stateManagment
     # todo: create startGame state, in which user can select board size and game difficulty
+    mode = 'reset'
     while True:
-        runGame()
+        mode = runGame(endless=(mode == 'endless'))
 
 
 def makeText(text, color):
@@ -63,28 +84,47 @@ def drawGameOver():
     textSurface, textRect = makeText('Game Over!!!', RED)
     textRect.center = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2)
     DISPLAY_SURFACE.blit(textSurface, textRect)
+    return textRect
 
 
 def drawGameWon():
     textSurface, textRect = makeText('You Won!!!', GREEN)
     textRect.center = (int(WINDOW_WIDTH / 2), int(WINDOW_HEIGHT / 2))
     DISPLAY_SURFACE.blit(textSurface, textRect)
+    return textRect
 
 
-def runGame():
+def runGame(endless=False):
     # mouse handling
     mouseLeftClicked = False
     mouseRightClicked = False
+    mouseMiddleClicked = False
     mouseX = 0
     mouseY = 0
 
-    # board
-    board = minesweeper.board.createRandomBoard(WINDOW_WIDTH, WINDOW_HEIGHT)
+    # board, endless boards start centered on the origin
+    camera = minesweeper.camera.Camera(DISPLAY_SURFACE.get_rect(), CELL_SIZE)
+    history = None  # undo is only available for tiled boards
+    heatmap = None  # mine probability overlay, toggled with p
+    if endless:
+        board = minesweeper.endless.EndlessBoard()
+        camera.centerOn(0, 0)
+    else:
+        # no guess boards come from the pool with their first click uncovered
+        board = BOARD_POOL.get(POOL_TIMEOUT)
+        if board is None:
+            board = minesweeper.board.createBoard(CELL_WIDTH, CELL_HEIGHT, MINE_COUNT,
+                                                  boardType=minesweeper.history.TiledBoard)
+        history = minesweeper.history.History(board)
 
     # game state
     gameOver = False
     gameWon = False
 
+    # the screen is cleared once, afterwards only the changed areas are pushed
+    DISPLAY_SURFACE.fill(BACKGROUND_COLOR)
+    pygame.display.update()
+
     # game loop
     while True:
 
@@ -97,6 +137,36 @@ def runGame():
                     terminate()
                 elif event.key == K_r:
                     return 'reset'  # we return, which will start a new game
+                elif event.key == K_e:
+                    return 'endless'
+                elif event.key == K_p:
+                    heatmap = None if heatmap else minesweeper.heatmap.Heatmap(board)
+                    board.dirty = True
+                elif event.key == K_z and history is not None:
+                    if history.undo():  # undoing the losing move continues the game
+                        gameOver = False
+                        gameWon = board.isSolved()
+                        if heatmap is not None:
+                            heatmap.rescan()
+                elif event.key == K_y and history is not None:
+                    if history.redo():
+                        gameOver = any(board.hasMine(x, y) and board.isVisible(x, y)
+                                       for y in range(board.height) for x in range(board.width))
+                        gameWon = board.isSolved()
+                        if heatmap is not None:
+                            heatmap.rescan()
+                elif event.key == K_LEFT:
+                    camera.pan(-PAN_STEP, 0)
+                elif event.key == K_RIGHT:
+                    camera.pan(PAN_STEP, 0)
+                elif event.key == K_UP:
+                    camera.pan(0, -PAN_STEP)
+                elif event.key == K_DOWN:
+                    camera.pan(0, PAN_STEP)
+                elif event.key in (K_PLUS, K_EQUALS, K_KP_PLUS):
+                    camera.zoom(ZOOM_STEP)
+                elif event.key in (K_MINUS, K_KP_MINUS):
+                    camera.zoom(1 / ZOOM_STEP)
             elif event.type == MOUSEBUTTONDOWN:
                 # event.button: number value representing the mouse button pressed or released
                 # event.pos: X,Y mouse position when the button was pressed or released
@@ -104,57 +174,86 @@ def runGame():
 
                 if event.button == MOUSE_BUTTON_LEFT:
                     mouseLeftClicked = True
-                elif event.button == MOUSE_BUTTON_RIGHT or event.button == MOUSE_BUTTON_MIDDLE:
+                elif event.button == MOUSE_BUTTON_RIGHT:
                     mouseRightClicked = True
+                elif event.button == MOUSE_BUTTON_MIDDLE:
+                    mouseMiddleClicked = True
+                elif event.button == MOUSE_WHEEL_UP:
+                    camera.zoom(ZOOM_STEP, event.pos)
+                elif event.button == MOUSE_WHEEL_DOWN:
+                    camera.zoom(1 / ZOOM_STEP, event.pos)
 
         # update state
+        changedCells = set()
         if not gameOver and not gameWon: # game play
             if mouseLeftClicked: # uncover
                 # transform screen coords into board coords
-                boardX, boardY = screenCordsToBoardCoords(board, mouseX, mouseY)
-                result = board.uncover(boardX, boardY)
+                boardX, boardY = camera.screenToBoard(mouseX, mouseY)
+                if board.visibleCount == 0 and board.width and board.validLocation(boardX, boardY):
+                    # place the mines again around the first click, so that it always opens an area
+                    board = minesweeper.board.createBoard(board.width, board.height, board.mineCount,
+                                                          boardType=type(board), safeCell=(boardX, boardY))
+                    if history is not None:
+                        history = minesweeper.history.History(board)
+                    if heatmap is not None:
+                        heatmap = minesweeper.heatmap.Heatmap(board)
+                if board.isVisible(boardX, boardY):  # clicking a number chords it
+                    result = board.chord(boardX, boardY)
+                else:
+                    result = board.uncover(boardX, boardY)
                 if result == 'mine':
                     gameOver = True
                 elif result == 'done':
                     gameWon = True
+                changedCells.update(board.lastRevealed)
                 mouseLeftClicked = False
 
+            if mouseMiddleClicked: # chord
+                boardX, boardY = camera.screenToBoard(mouseX, mouseY)
+                result = board.chord(boardX, boardY)
+                if result == 'mine':
+                    gameOver = True
+                elif result == 'done':
+                    gameWon = True
+                changedCells.update(board.lastRevealed)
+                mouseMiddleClicked = False
+
             if mouseRightClicked: # flag
                 # transform screen coords into board coords
-                boardX, boardY = screenCordsToBoardCoords(board, mouseX, mouseY)
-                board.toggleFlag(boardX, boardY)
+                boardX, boardY = camera.screenToBoard(mouseX, mouseY)
+                if board.toggleFlag(boardX, boardY):
+                    changedCells.add((boardX, boardY))
                 mouseRightClicked = False
 
-        # draw board
-        DISPLAY_SURFACE.fill(BACKGROUND_COLOR)
-        (boardSurface, boardRect) = board.draw()
-        DISPLAY_SURFACE.blit(boardSurface, boardRect)
+        # record the move and update the probabilities around it
+        if changedCells:
+            if history is not None:
+                history.record()
+            if heatmap is not None:
+                heatmap.update(changedCells)
 
-        # draw game state specifics
-        if gameOver:
+        # draw the visible part of the board, only changed cells get pushed to the screen
+        camera.clamp(board)
+        updateRects = camera.draw(board, DISPLAY_SURFACE, heatmap)
+
+        # draw game state specifics on top of anything that changed underneath
+        if gameOver and updateRects:
             # todo: game over do something
-            drawGameOver()
-        elif gameWon:
+            updateRects.append(drawGameOver())
+        elif gameWon and updateRects:
             # todo: game won do something
-            drawGameWon()
+            updateRects.append(drawGameWon())
         else:
             # todo: create some nice UI, which displays flag count, solved percentage etc
             pass
 
-        # draw to screen
-        pygame.display.update()
+        # draw the changed areas to screen
+        pygame.display.update(updateRects)
         FPS_CLOCK.tick(FPS)
 
 
-def screenCordsToBoardCoords(board, screenX, screenY):
-    # todo: put the board into a specific position and transform and scale accordingly
-    # todo: so that it allways fills that specific area, irregardless of cell count
-    boardX = int(screenX / board.CELL_WIDTH)
-    boardY = int(screenY / board.CELL_HEIGHT)
-    return boardX, boardY
-
-
 def terminate():
+    BOARD_POOL.close()
     pygame.quit()
     sys.exit()
 
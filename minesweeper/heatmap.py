@@ -0,0 +1,84 @@
+import pygame
+import minesweeper.solver
+
+from minesweeper.board import VISIBLE, FLAG, RED
+
+# shading, probabilities are rounded to SHADE_LEVELS steps, level 0 is not drawn
+SHADE_LEVELS = 16
+SHADE_COLOR = RED
+MAX_SHADE_ALPHA = 192
+
+# shade atlases by cell size, shared by all heatmaps of the process
+SHADE_ATLASES = {}
+
+
+def getShadeLevel(probability):
+    return min(int(probability * SHADE_LEVELS), SHADE_LEVELS - 1)
+
+
+def getShadeAtlas(cellSize):
+    """returns a surface with one translucent cell per shade level side by side, it is rendered on the first request"""
+    if cellSize not in SHADE_ATLASES:
+        atlas = pygame.Surface((cellSize * SHADE_LEVELS, cellSize), pygame.SRCALPHA)
+        for level in range(1, SHADE_LEVELS):
+            alpha = MAX_SHADE_ALPHA * level // (SHADE_LEVELS - 1)
+            atlas.fill(SHADE_COLOR + (alpha,), (level * cellSize, 0, cellSize, cellSize))
+        SHADE_ATLASES[cellSize] = atlas
+    return SHADE_ATLASES[cellSize]
+
+
+class Heatmap:
+    """"shades every hidden cell by its mine probability
+
+    the probabilities come from a Solver, which only solves the frontier
+    components again that changed since the last update and reuses the cached
+    results of the others. only cells whose shade level changed are marked for
+    repainting, the camera draws the shades of the repainted cells in one blits call
+    """
+
+    def __init__(self, board):
+        self.board = board
+        self.solver = minesweeper.solver.Solver(board)
+        self.levels = {}  # frontier cell -> shade level
+        self.interiorLevel = 0  # shade level of the hidden cells that do not touch a number
+        self.refresh()
+
+    def update(self, cells):
+        """updates the probabilities after the passed cells changed"""
+        self.solver.update(cells)
+        self.refresh()
+
+    def rescan(self):
+        """reads the whole board again, after it was replaced by an undo or redo"""
+        self.solver.rescan()
+        self.refresh()
+
+    def refresh(self):
+        """solves the changed components and marks the cells, whose shade level changed"""
+        solution = self.solver.solve()
+        levels = {}
+        for (cells, mineCount) in self.solver.constraints.values():  # contradicting components stay unshaded
+            levels.update(dict.fromkeys(cells, 0))
+        levels.update((cell, getShadeLevel(probability)) for (cell, probability) in solution.probabilities.items())
+        interiorLevel = getShadeLevel(solution.interiorProbability)
+
+        if interiorLevel != self.interiorLevel:  # every interior cell changes
+            self.board.dirty = True
+        elif not self.board.dirty:
+            changed = set(cell for (cell, level) in levels.items() if self.levels.get(cell, interiorLevel) != level)
+            changed.update(cell for cell in self.levels if cell not in levels)
+            self.board.dirtyCells.update(changed)
+        self.levels = levels
+        self.interiorLevel = interiorLevel
+
+    def drawShades(self, surface, cellSize, cells):
+        """draws the shades of the ((screenX, screenY), x, y, value) cells in one blits call"""
+        atlas = getShadeAtlas(cellSize)
+        shades = []
+        for (position, x, y, value) in cells:
+            if value & (VISIBLE | FLAG):
+                continue
+            level = self.levels.get((x, y), self.interiorLevel)
+            if level:
+                shades.append((atlas, position, (level * cellSize, 0, cellSize, cellSize)))
+        surface.blits(shades, False)
@@ -0,0 +1,206 @@
+import sys
+import collections
+import minesweeper.board
+
+from minesweeper.board import MINE
+
+# tile sizes, a tile is a bytearray of TILE_SIZE x TILE_SIZE cells
+TILE_BITS = 4
+TILE_SIZE = 1 << TILE_BITS
+TILE_MASK = TILE_SIZE - 1
+
+# the tiles are the leaves of a tree with NODE_SIZE children per node
+NODE_BITS = 5
+NODE_SIZE = 1 << NODE_BITS
+NODE_MASK = NODE_SIZE - 1
+
+# a stored state of a TiledBoard
+Version = collections.namedtuple('Version', ['root', 'visibleCount', 'mineCount', 'flagCount'])
+
+
+class TiledBoard(minesweeper.board.Board):
+    """"a board that keeps its cells in fixed size tiles, which are shared between versions
+
+    the tiles are the leaves of a tree, self.m is its root. a snapshot
+    only stores the root, afterwards every tile and node is copied
+    the first time it is written, together with its path to the root.
+    so a move creates a new version in O(changed tiles), while the
+    unchanged tiles stay shared with all older versions
+    """
+
+    def createMatrix(self, width, height):
+        """creates the tree, all tiles and nodes of an empty board are shared"""
+        self.tilesX = (width + TILE_MASK) >> TILE_BITS
+        tileCount = self.tilesX * ((height + TILE_MASK) >> TILE_BITS)
+        levels = 1
+        while NODE_SIZE ** levels < tileCount:
+            levels += 1
+        self.shifts = [level * NODE_BITS for level in range(levels - 1, -1, -1)]
+
+        self.tiles = {}  # tile index -> tile of the current version
+        self.writableTiles = {}  # tile index -> tile copied since the last snapshot
+        self.ownedNodes = set()  # ids of the nodes copied since the last snapshot
+
+        node = bytearray(TILE_SIZE * TILE_SIZE)
+        for level in range(levels):
+            node = [node] * NODE_SIZE
+        return node
+
+    def getTile(self, tileIndex):
+        tile = self.tiles.get(tileIndex)
+        if tile is None:
+            tile = self.m
+            for shift in self.shifts:
+                tile = tile[(tileIndex >> shift) & NODE_MASK]
+            self.tiles[tileIndex] = tile
+        return tile
+
+    def getWritableTile(self, tileIndex):
+        """returns the tile for writing, it and its path are copied if they are shared with a snapshot"""
+        tile = self.writableTiles.get(tileIndex)
+        if tile is not None:
+            return tile
+
+        if id(self.m) not in self.ownedNodes:
+            self.m = list(self.m)
+            self.ownedNodes.add(id(self.m))
+        node = self.m
+        for shift in self.shifts[:-1]:
+            slot = (tileIndex >> shift) & NODE_MASK
+            if id(node[slot]) not in self.ownedNodes:
+                node[slot] = list(node[slot])
+                self.ownedNodes.add(id(node[slot]))
+            node = node[slot]
+
+        tile = bytearray(node[tileIndex & NODE_MASK])
+        node[tileIndex & NODE_MASK] = tile
+        self.tiles[tileIndex] = tile
+        self.writableTiles[tileIndex] = tile
+        return tile
+
+    def get(self, x, y):
+        if not self.validLocation(x, y):
+            return False
+        tile = self.getTile((y >> TILE_BITS) * self.tilesX + (x >> TILE_BITS))
+        return tile[((y & TILE_MASK) << TILE_BITS) | (x & TILE_MASK)]
+
+    def _set(self, x, y, bits):
+        if not self.validLocation(x, y):
+            return False
+
+        if not self.dirty:  # a pending full repaint covers the cell
+            self.dirtyCells.add((x, y))
+        tile = self.getWritableTile((y >> TILE_BITS) * self.tilesX + (x >> TILE_BITS))
+        tile[((y & TILE_MASK) << TILE_BITS) | (x & TILE_MASK)] |= bits
+        return True
+
+    def _clear(self, x, y, bits):
+        if not self.validLocation(x, y):
+            return False
+
+        if not self.dirty:  # a pending full repaint covers the cell
+            self.dirtyCells.add((x, y))
+        tile = self.getWritableTile((y >> TILE_BITS) * self.tilesX + (x >> TILE_BITS))
+        tile[((y & TILE_MASK) << TILE_BITS) | (x & TILE_MASK)] &= ~bits & 0xFF
+        return True
+
+    def getRow(self, y):
+        """returns a copy of the cell values of row y"""
+        row = []
+        offset = (y & TILE_MASK) << TILE_BITS
+        firstTile = (y >> TILE_BITS) * self.tilesX
+        for tileIndex in range(firstTile, firstTile + self.tilesX):
+            row.extend(self.getTile(tileIndex)[offset:offset + TILE_SIZE])
+        del row[self.width:]
+        return row
+
+    def setRow(self, y, values):
+        """overwrites the cell values of row y"""
+        offset = (y & TILE_MASK) << TILE_BITS
+        firstTile = (y >> TILE_BITS) * self.tilesX
+        for tileX in range(self.tilesX):
+            span = values[tileX * TILE_SIZE:(tileX + 1) * TILE_SIZE]
+            self.getWritableTile(firstTile + tileX)[offset:offset + len(span)] = bytes(span)
+        self.dirty = True
+
+    def getRegion(self, x, y, width, height):
+        """returns the cell values of the width x height region at x, y
+        as a list of rows, the region is clipped to the board"""
+        return [self.getRow(regionY)[max(x, 0):x + width]
+                for regionY in range(max(y, 0), min(y + height, self.height))]
+
+    def plantMines(self, mineCount, seed=None, safeCell=None):
+        """places mineCount mines on the empty board and counts the neighbouring mines of every cell"""
+        for index in self.getMinePositions(mineCount, seed, safeCell):
+            (y, x) = divmod(index, self.width)
+            self._set(x, y, MINE)
+        self.mineCount += mineCount
+        self.computeMineCounts()
+
+    def computeMineCounts(self):
+        """stores the neighbourhood mine count of every cell in its count bits, one row at a time"""
+        for (y, row) in minesweeper.board.countMineRows(self.getRow, self.width, self.height):
+            self.setRow(y, row)
+
+    def snapshot(self):
+        """returns the current Version, later writes copy the tiles they change"""
+        self.writableTiles.clear()
+        self.ownedNodes.clear()
+        return Version(self.m, self.visibleCount, self.mineCount, self.flagCount)
+
+    def restore(self, version):
+        """switches the board to a Version returned by snapshot"""
+        self.m = version.root
+        self.visibleCount = version.visibleCount
+        self.mineCount = version.mineCount
+        self.flagCount = version.flagCount
+        self.tiles = {}
+        self.writableTiles.clear()
+        self.ownedNodes.clear()
+        self.lastRevealed = set()
+        self.dirty = True
+        self.dirtyCells.clear()
+
+
+class History:
+    """"undo and redo for a TiledBoard, every recorded move is a Version of the board"""
+
+    def __init__(self, board):
+        self.board = board
+        self.versions = [board.snapshot()]
+        self.position = 0
+
+    def record(self):
+        """stores the current board as a new version, the versions that could be redone are dropped"""
+        del self.versions[self.position + 1:]
+        self.versions.append(self.board.snapshot())
+        self.position += 1
+
+    def undo(self):
+        if self.position == 0:
+            return False
+        self.position -= 1
+        self.board.restore(self.versions[self.position])
+        return True
+
+    def redo(self):
+        if self.position + 1 >= len(self.versions):
+            return False
+        self.position += 1
+        self.board.restore(self.versions[self.position])
+        return True
+
+    def memoryUsage(self):
+        """returns the amount of bytes held by the tiles and nodes of all versions, shared ones are counted once"""
+        seen = set()
+        size = 0
+        nodes = [version.root for version in self.versions]
+        while nodes:
+            node = nodes.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            size += sys.getsizeof(node)
+            if isinstance(node, list):
+                nodes.extend(node)
+        return size
@@ -0,0 +1,92 @@
+import pygame
+import minesweeper.board
+
+from minesweeper.board import HIDDEN_COLOR, VISIBLE_COLOR, MINE_COLOR, FLAG_COLOR, numpy
+
+# the pyramid stops once a level fits into a single pixel, or at MAX_LEVEL
+MAX_LEVEL = 16
+
+# colors of the atlas tiles, the mine counts are not shown
+TILE_COLORS = {minesweeper.board.HIDDEN_TILE: HIDDEN_COLOR,
+               minesweeper.board.MINE_TILE: MINE_COLOR,
+               minesweeper.board.FLAG_TILE: FLAG_COLOR}
+
+
+def getPalette():
+    """returns a (values, 3) array with the color of every cell value"""
+    values = minesweeper.board.FLAG * 2
+    return numpy.array([TILE_COLORS.get(minesweeper.board.getTileIndex(value), VISIBLE_COLOR)
+                        for value in range(values)], dtype=numpy.uint8)
+
+
+def downsample(level):
+    """returns the (height, width, 3) color level at half the size, a pixel is the mean of its 2x2 block
+    odd edges are repeated, so edge pixels are not darkened by missing cells
+    """
+    (height, width) = level.shape[:2]
+    padded = numpy.pad(level, ((0, height % 2), (0, width % 2), (0, 0)), mode='edge').astype(numpy.uint16)
+    blocks = padded[0::2, 0::2] + padded[1::2, 0::2] + padded[0::2, 1::2] + padded[1::2, 1::2]
+    return ((blocks + 2) >> 2).astype(numpy.uint8)
+
+
+class Overview:
+    """"a mip map of the cell colors of a bounded board, for drawing it zoomed out
+
+    level 0 has one pixel per cell, every further level halves the size,
+    so at level k one pixel shows 2^k x 2^k cells. changed cells are written
+    into level 0 and only their parent pixels are computed again on the levels above.
+    drawing a view is a single surfarray copy of the visible part of one level
+    """
+
+    def __init__(self, board):
+        assert numpy is not None, 'the overview needs numpy'
+        self.board = board
+        self.palette = getPalette()
+        self.levels = []
+        self.rebuild()
+
+    def rebuild(self):
+        """computes all levels from the whole board"""
+        if isinstance(self.board.m, numpy.ndarray):
+            values = self.board.m
+        else:
+            values = numpy.array([self.board.getRow(y) for y in range(self.board.height)], dtype=numpy.uint8)
+        self.levels = [self.palette[values]]
+        while len(self.levels) <= MAX_LEVEL and max(self.levels[-1].shape[:2]) > 1:
+            self.levels.append(downsample(self.levels[-1]))
+        self.stale = False
+
+    def update(self, cells):
+        """writes the changed (x, y) cells into level 0 and computes their parents on the levels above"""
+        if not cells:
+            return
+        (xs, ys) = numpy.array(list(cells), dtype=numpy.intp).T
+        values = numpy.array([self.board.get(x, y) for (x, y) in cells], dtype=numpy.uint8)
+        self.levels[0][ys, xs] = self.palette[values]
+
+        for (child, level) in zip(self.levels, self.levels[1:]):
+            # the parents of the changed pixels, each parent only once
+            parents = numpy.unique((ys >> 1) * level.shape[1] + (xs >> 1))
+            (ys, xs) = numpy.divmod(parents, level.shape[1])
+
+            # mean of the 2x2 children, children outside of the level repeat the edge like downsample
+            (height, width) = child.shape[:2]
+            left, top = xs * 2, ys * 2
+            right, bottom = numpy.minimum(left + 1, width - 1), numpy.minimum(top + 1, height - 1)
+            blocks = (child[top, left].astype(numpy.uint16) + child[bottom, left]
+                      + child[top, right] + child[bottom, right])
+            level[ys, xs] = (blocks + 2) >> 2
+
+    def draw(self, surface, destination, level, x, y, width, height):
+        """copies the width x height pixels at x, y of the level to destination on the surface
+        returns the drawn screen rect
+        """
+        pixels = self.levels[min(level, len(self.levels) - 1)]
+        left, top = max(x, 0), max(y, 0)
+        right, bottom = min(x + width, pixels.shape[1]), min(y + height, pixels.shape[0])
+        if left >= right or top >= bottom:
+            return pygame.Rect(destination, (0, 0))
+
+        # surfarray indexes pixels as [x][y]
+        area = pygame.surfarray.make_surface(pixels[top:bottom, left:right].transpose(1, 0, 2))
+        return surface.blit(area, (destination[0] + left - x, destination[1] + top - y))
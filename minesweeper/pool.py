@@ -0,0 +1,143 @@
+import time
+import random
+import argparse
+import multiprocessing
+import queue
+import minesweeper.board
+import minesweeper.solver
+
+# boards kept ready per pool
+POOL_SIZE = 16
+
+# seconds between the throughput reports of the command line tool
+REPORT_INTERVAL = 5.0
+
+
+def isNoGuess(width, height, mineCount, seed, safeCell):
+    """plays the board from safeCell with certain moves only
+    returns True if it can be finished without guessing
+    """
+    board = minesweeper.board.createBoard(width, height, mineCount, seed=seed, safeCell=safeCell)
+    solver = minesweeper.solver.Solver(board)
+    board.uncover(*safeCell)
+    solver.update(board.lastRevealed)
+    while not board.isSolved():
+        solution = solver.solve()
+        for (x, y) in solution.mines:
+            board.setFlag(x, y)
+        if solution.mines:
+            solver.update(solution.mines)
+
+        cells = [(x, y) for (x, y) in solution.safe if not board.isVisible(x, y)]
+        if not cells and board.flagCount == board.mineCount:  # every mine is known, the rest is safe
+            cells = [(x, y) for y in range(height) for x in range(width)
+                     if not board.isVisible(x, y) and not board.hasFlag(x, y)]
+        if not cells:
+            return False
+
+        result = board.uncoverMany(cells)
+        if result == 'mine':  # the solver is sound, this should never happen
+            return False
+        solver.update(board.lastRevealed)
+    return True
+
+
+def getSafeCell(width, height, seed):
+    """returns the first click of the board with this seed"""
+    rng = random.Random('safe:%d' % seed)
+    return rng.randrange(width), rng.randrange(height)
+
+
+def fillPool(boards, width, height, mineCount, firstSeed, attempts, found):
+    """worker process, tries consecutive seeds and puts the (seed, safeX, safeY)
+    of every no guess board into the boards queue, blocks while the queue is full
+    """
+    seed = firstSeed
+    while True:
+        safeCell = getSafeCell(width, height, seed)
+        if isNoGuess(width, height, mineCount, seed, safeCell):
+            with found.get_lock():
+                found.value += 1
+            boards.put((seed,) + safeCell)
+        with attempts.get_lock():
+            attempts.value += 1
+        seed += 1
+
+
+class BoardPool:
+    """"keeps a bounded queue of verified no guess boards of one size and mine count
+
+    the boards are generated and solved by a background process.
+    a board is stored as its seed and first click, it is created
+    again from those in the process that takes it from the pool
+    """
+
+    def __init__(self, width, height, mineCount, size=POOL_SIZE, seed=None, boardType=None):
+        self.width = width
+        self.height = height
+        self.mineCount = mineCount
+        self.boardType = boardType  # the type of the boards returned by get
+        if seed is None:
+            seed = random.getrandbits(32)
+
+        # counters shared with the worker
+        self.attempts = multiprocessing.Value('L', 0)
+        self.found = multiprocessing.Value('L', 0)
+        self.startTime = time.perf_counter()
+
+        self.boards = multiprocessing.Queue(size)
+        self.worker = multiprocessing.Process(target=fillPool, daemon=True,
+                                              args=(self.boards, width, height, mineCount, seed,
+                                                    self.attempts, self.found))
+        self.worker.start()
+
+    def get(self, timeout=None):
+        """returns a no guess board with its first click already uncovered
+        waits for the worker if the pool is empty, returns None after timeout seconds
+        """
+        try:
+            (seed, safeX, safeY) = self.boards.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        board = minesweeper.board.createBoard(self.width, self.height, self.mineCount,
+                                              boardType=self.boardType, seed=seed, safeCell=(safeX, safeY))
+        board.uncover(safeX, safeY)
+        return board
+
+    def getStats(self):
+        """returns (boards found, boards tried, elapsed seconds)"""
+        return self.found.value, self.attempts.value, time.perf_counter() - self.startTime
+
+    def close(self):
+        self.worker.terminate()
+        self.worker.join()
+        self.boards.cancel_join_thread()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='generates no guess minesweeper boards and reports the throughput')
+    parser.add_argument('--width', type=int, default=30)
+    parser.add_argument('--height', type=int, default=16)
+    parser.add_argument('--mines', type=int, default=99)
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    # the pool is drained as it fills, so the worker never waits
+    pool = BoardPool(args.width, args.height, args.mines, seed=args.seed)
+    nextReport = REPORT_INTERVAL
+    while True:
+        (found, attempts, elapsed) = pool.getStats()
+        if elapsed >= nextReport or elapsed >= args.seconds:
+            print('%dx%d with %d mines: %d of %d boards no guess (%.1f%%), %.2f boards/s, %.1f tried/s' % (
+                args.width, args.height, args.mines, found, attempts,
+                100.0 * found / max(attempts, 1), found / elapsed, attempts / elapsed))
+            nextReport += REPORT_INTERVAL
+        if elapsed >= args.seconds:
+            break
+        pool.get(timeout=0.1)
+    pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+import mmap
+import struct
+import zlib
+import minesweeper.board
+import minesweeper.endless
+import minesweeper.bitboard
+
+from minesweeper.board import VISIBLE, MINE, FLAG, COUNT, CELL_SIZE, numpy
+
+# board file format
+# header: magic, version, width, height, mineCount, visibleCount, flagCount
+# followed by the mine, visible and flag planes with one bit per cell
+# and the count plane with four bits per cell, all in row major order
+# bit i of a plane is bit (i % 8) of byte (i // 8), count i is nibble (i % 2) of byte (i // 2)
+BOARD_MAGIC = b'MSWB'
+BOARD_HEADER = struct.Struct('<4sHxxIIIII')
+
+# endless board file format
+# header: magic, version, seed, mineChance, visibleCount, flagCount, chunkCount
+# followed by chunkX, chunkY, size and the zlib compressed visible and flag bits of every played chunk
+ENDLESS_MAGIC = b'MSWE'
+ENDLESS_HEADER = struct.Struct('<4sHxxQdIII')
+CHUNK_HEADER = struct.Struct('<iiI')
+
+VERSION = 1
+
+
+def getPlaneSize(cellCount):
+    return (cellCount + 7) // 8
+
+
+def packBoard(board):
+    """returns the mine, visible, flag and count planes of the board as bytes"""
+    cellCount = board.width * board.height
+    if numpy is not None:
+        values = numpy.array([board.getRow(y) for y in range(board.height)], dtype=numpy.uint8).reshape(-1)
+        planes = [numpy.packbits((values & bit) != 0, bitorder='little').tobytes() for bit in (MINE, VISIBLE, FLAG)]
+        counts = numpy.zeros(getPlaneSize(cellCount * 4), dtype=numpy.uint8)
+        counts[:(cellCount + 1) // 2] = values[0::2] & COUNT
+        counts[:cellCount // 2] |= (values[1::2] & COUNT) << 4
+        return planes + [counts.tobytes()]
+
+    planes = [bytearray(getPlaneSize(cellCount)) for bit in (MINE, VISIBLE, FLAG)]
+    counts = bytearray(getPlaneSize(cellCount * 4))
+    index = 0
+    for y in range(board.height):
+        for value in board.getRow(y):
+            for (plane, bit) in zip(planes, (MINE, VISIBLE, FLAG)):
+                if value & bit:
+                    plane[index >> 3] |= 1 << (index & 7)
+            counts[index >> 1] |= (value & COUNT) << ((index & 1) * 4)
+            index += 1
+    return [bytes(plane) for plane in planes] + [bytes(counts)]
+
+
+def saveBoard(board, path):
+    """writes the board to path"""
+    if isinstance(board, minesweeper.endless.EndlessBoard):
+        return saveEndlessBoard(board, path)
+
+    header = BOARD_HEADER.pack(BOARD_MAGIC, VERSION, board.width, board.height,
+                               board.mineCount, board.visibleCount, board.flagCount)
+    if isinstance(board, MappedBoard):  # the mapped planes are already in the file format
+        planes = [board.data[BOARD_HEADER.size:]]
+    else:
+        planes = packBoard(board)
+
+    with open(path, 'wb') as saveFile:
+        saveFile.write(header)
+        for plane in planes:
+            saveFile.write(plane)
+
+
+def saveEndlessBoard(board, path):
+    """writes the seed and the played chunks of the endless board to path"""
+    states = dict(board.savedStates)
+    for (key, chunk) in board.chunks.items():
+        state = chunk.translate(minesweeper.endless.STATE_TABLE)
+        if state.count(0) < minesweeper.endless.CHUNK_CELLS:
+            states[key] = zlib.compress(state)
+
+    with open(path, 'wb') as saveFile:
+        saveFile.write(ENDLESS_HEADER.pack(ENDLESS_MAGIC, VERSION, board.seed, board.mineChance,
+                                           board.visibleCount, board.flagCount, len(states)))
+        for ((chunkX, chunkY), state) in states.items():
+            saveFile.write(CHUNK_HEADER.pack(chunkX, chunkY, len(state)))
+            saveFile.write(state)
+
+
+def loadBoard(path, cellSize=CELL_SIZE):
+    """opens a board written by saveBoard"""
+    with open(path, 'rb') as saveFile:
+        magic = saveFile.read(4)
+    if magic == ENDLESS_MAGIC:
+        return loadEndlessBoard(path, cellSize)
+    return MappedBoard(path, cellSize)
+
+
+def loadEndlessBoard(path, cellSize=CELL_SIZE):
+    """restores an endless board, its chunks are generated again when they are visited"""
+    with open(path, 'rb') as saveFile:
+        data = saveFile.read()
+
+    (magic, version, seed, mineChance, visibleCount, flagCount, chunkCount) = ENDLESS_HEADER.unpack_from(data)
+    assert magic == ENDLESS_MAGIC and version == VERSION, 'not an endless minesweeper board'
+    board = minesweeper.endless.EndlessBoard(seed, mineChance, cellSize)
+    board.visibleCount = visibleCount
+    board.flagCount = flagCount
+
+    offset = ENDLESS_HEADER.size
+    for i in range(chunkCount):
+        (chunkX, chunkY, size) = CHUNK_HEADER.unpack_from(data, offset)
+        offset += CHUNK_HEADER.size
+        board.savedStates[(chunkX, chunkY)] = data[offset:offset + size]
+        offset += size
+    return board
+
+
+class MappedBoard(minesweeper.board.Board):
+    """"a board that reads and writes its cells directly in a memory mapped save file
+
+    opening the file does not read the planes, the pages of the viewed
+    cells are loaded by the os on the first access.
+    the file is mapped copy on write, changes are only stored by saving the board
+    """
+
+    def __init__(self, path, cellSize=CELL_SIZE):
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_COPY)
+        (magic, version, width, height, mineCount, visibleCount, flagCount) = BOARD_HEADER.unpack_from(self.data)
+        assert magic == BOARD_MAGIC and version == VERSION, 'not a minesweeper board'
+
+        minesweeper.board.Board.__init__(self, width, height, cellSize)
+        self.mineCount = mineCount
+        self.visibleCount = visibleCount
+        self.flagCount = flagCount
+
+        # plane offsets
+        planeSize = getPlaneSize(width * height)
+        self.planes = [(BOARD_HEADER.size + i * planeSize, bit) for (i, bit) in enumerate((MINE, VISIBLE, FLAG))]
+        self.countOffset = BOARD_HEADER.size + 3 * planeSize
+
+    def createMatrix(self, width, height):
+        """the cells are stored in the mapped file"""
+        return None
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def get(self, x, y):
+        if not self.validLocation(x, y):
+            return False
+
+        index = y * self.width + x
+        byteIndex, bit = index >> 3, 1 << (index & 7)
+        value = self.data[self.countOffset + (index >> 1)] >> ((index & 1) * 4) & COUNT
+        for (offset, planeBit) in self.planes:
+            if self.data[offset + byteIndex] & bit:
+                value |= planeBit
+        return value
+
+    def _set(self, x, y, bits):
+        if not self.validLocation(x, y):
+            return False
+
+        if not self.dirty:  # a pending full repaint covers the cell
+            self.dirtyCells.add((x, y))
+        index = y * self.width + x
+        byteIndex, bit = index >> 3, 1 << (index & 7)
+        for (offset, planeBit) in self.planes:
+            if bits & planeBit:
+                self.data[offset + byteIndex] |= bit
+        self.data[self.countOffset + (index >> 1)] |= (bits & COUNT) << ((index & 1) * 4)
+        return True
+
+    def _clear(self, x, y, bits):
+        if not self.validLocation(x, y):
+            return False
+
+        if not self.dirty:  # a pending full repaint covers the cell
+            self.dirtyCells.add((x, y))
+        index = y * self.width + x
+        byteIndex, bit = index >> 3, 1 << (index & 7)
+        for (offset, planeBit) in self.planes:
+            if bits & planeBit:
+                self.data[offset + byteIndex] &= ~bit & 0xFF
+        self.data[self.countOffset + (index >> 1)] &= ~((bits & COUNT) << ((index & 1) * 4)) & 0xFF
+        return True
+
+    def getRow(self, y):
+        """returns a copy of the cell values of row y"""
+        return [self.get(x, y) for x in range(self.width)]
+
+    def getRegion(self, x, y, width, height):
+        """returns the cell values of the width x height region at x, y
+        as a list of rows, the region is clipped to the board"""
+        return [[self.get(regionX, regionY) for regionX in range(max(x, 0), min(x + width, self.width))]
+                for regionY in range(max(y, 0), min(y + height, self.height))]
+
+    def computeMineCounts(self):
+        """counts the neighbouring mines of the mapped mine plane with the bit sliced adders of the bitboard
+        and writes them into the count plane
+        """
+        cellCount = self.width * self.height
+        mineOffset = self.planes[0][0]
+        bits = minesweeper.bitboard.BitBoard(self.width, self.height)
+        bits.mines = int.from_bytes(self.data[mineOffset:mineOffset + getPlaneSize(cellCount)], 'little')
+        bits.computeMineCounts()
+
+        # join the count bit planes into one nibble per cell
+        planes = [plane.to_bytes(getPlaneSize(cellCount), 'little') for plane in bits.counts]
+        if numpy is not None:
+            values = numpy.zeros(cellCount, dtype=numpy.uint8)
+            for (bit, plane) in enumerate(planes):
+                values |= numpy.unpackbits(numpy.frombuffer(plane, dtype=numpy.uint8),
+                                           count=cellCount, bitorder='little') << bit
+            counts = numpy.zeros(getPlaneSize(cellCount * 4), dtype=numpy.uint8)
+            counts[:(cellCount + 1) // 2] = values[0::2]
+            counts[:cellCount // 2] |= values[1::2] << 4
+            counts = counts.tobytes()
+        else:
+            counts = bytearray(getPlaneSize(cellCount * 4))
+            for index in range(cellCount):
+                value = 0
+                for (bit, plane) in enumerate(planes):
+                    value |= (plane[index >> 3] >> (index & 7) & 1) << bit
+                counts[index >> 1] |= value << ((index & 1) * 4)
+        self.data[self.countOffset:self.countOffset + len(counts)] = counts
+        self.dirty = True
@@ -0,0 +1,199 @@
+import os
+import time
+import random
+import argparse
+import collections
+import concurrent.futures
+import minesweeper.board
+import minesweeper.solver
+
+# default game settings, the expert board
+BOARD_WIDTH = 30
+BOARD_HEIGHT = 16
+MINE_COUNT = 99
+
+# games per task sent to a worker process
+BATCH_SIZE = 1000
+
+# moves
+UNCOVER = 'uncover'
+FLAG = 'flag'
+
+
+class RandomStrategy:
+    """"uncovers a random hidden cell every move"""
+
+    def __init__(self, board, rng):
+        self.board = board
+        self.rng = rng
+        self.hidden = [(x, y) for y in range(board.height) for x in range(board.width)]
+
+    def update(self, revealed):
+        pass
+
+    def nextMoves(self):
+        """returns a list of (move, x, y)"""
+        while self.hidden:
+            index = self.rng.randrange(len(self.hidden))
+            (x, y) = self.hidden[index]
+            self.hidden[index] = self.hidden[-1]
+            self.hidden.pop()
+            if not self.board.isVisible(x, y):
+                return [(UNCOVER, x, y)]
+        return []
+
+
+class SolverStrategy:
+    """"plays every cell the solver is certain about, flags the certain mines
+    and otherwise guesses the cell with the lowest mine probability
+    """
+
+    def __init__(self, board, rng):
+        self.board = board
+        self.rng = rng
+        self.solver = minesweeper.solver.Solver(board)
+
+    def update(self, revealed):
+        self.solver.update(revealed)
+
+    def nextMoves(self):
+        """returns a list of (move, x, y)"""
+        solution = self.solver.solve()
+        moves = [(UNCOVER, x, y) for (x, y) in solution.safe if not self.board.isVisible(x, y)]
+        moves.extend((FLAG, x, y) for (x, y) in solution.mines if not self.board.hasFlag(x, y))
+        if moves:
+            return moves
+
+        # guess, prefer an interior cell if it is less likely to be a mine
+        if solution.probabilities:
+            (x, y) = min(solution.probabilities, key=solution.probabilities.get)
+            if solution.probabilities[(x, y)] <= solution.interiorProbability:
+                return [(UNCOVER, x, y)]
+        return self.guessInterior(solution.probabilities)
+
+    def guessInterior(self, frontier):
+        """returns a move on a random hidden cell that does not touch a number"""
+        for attempt in range(self.board.width * self.board.height):
+            x, y = self.rng.randrange(self.board.width), self.rng.randrange(self.board.height)
+            if not self.board.isVisible(x, y) and not self.board.hasFlag(x, y) and (x, y) not in frontier:
+                return [(UNCOVER, x, y)]
+
+        # no interior cell found, take any hidden cell
+        for y in range(self.board.height):
+            for x in range(self.board.width):
+                if not self.board.isVisible(x, y) and not self.board.hasFlag(x, y):
+                    return [(UNCOVER, x, y)]
+        return []
+
+
+STRATEGIES = {'random': RandomStrategy,
+              'solver': SolverStrategy}
+
+
+def playGame(width, height, mineCount, strategyType, seed, revealTimes):
+    """plays a single game, records the time of every batch of uncovers
+    in the revealTimes histogram (microseconds -> count) and returns True if the game was won
+    """
+    # the first click is always safe, the strategy plays from there
+    rng = random.Random('strategy:%d' % seed)  # a separate stream, so guesses do not follow the mines
+    firstMove = (UNCOVER, rng.randrange(width), rng.randrange(height))
+    board = minesweeper.board.createBoard(width, height, mineCount, seed=seed, safeCell=firstMove[1:])
+    strategy = strategyType(board, rng)
+
+    moves = [firstMove]
+    while True:
+        if not moves:
+            return False
+
+        # flags first, then all uncovers of the step in one batch
+        flags = [(x, y) for (move, x, y) in moves if move == FLAG]
+        for (x, y) in flags:
+            board.toggleFlag(x, y)
+        if flags:
+            strategy.update(flags)
+
+        cells = [(x, y) for (move, x, y) in moves if move == UNCOVER]
+        if cells:
+            start = time.perf_counter()
+            result = board.uncoverMany(cells)
+            revealTimes[int((time.perf_counter() - start) * 1000000)] += 1
+            if result == 'mine':
+                return False
+            if result == 'done':
+                return True
+            strategy.update(board.lastRevealed)
+
+        moves = strategy.nextMoves()
+
+
+def playBatch(width, height, mineCount, strategyName, firstSeed, gameCount):
+    """plays gameCount games with consecutive seeds, this is the task run by the workers
+    returns (games won, reveal time histogram)
+    """
+    strategyType = STRATEGIES[strategyName]
+    revealTimes = collections.Counter()
+    wins = 0
+    for seed in range(firstSeed, firstSeed + gameCount):
+        if playGame(width, height, mineCount, strategyType, seed, revealTimes):
+            wins += 1
+    return wins, revealTimes
+
+
+def percentile(histogram, fraction):
+    """returns the value below which the passed fraction of the histogram lies"""
+    total = sum(histogram.values())
+    target = fraction * total
+    seen = 0
+    for value in sorted(histogram.keys()):
+        seen += histogram[value]
+        if seen >= target:
+            return value
+    return 0
+
+
+def simulate(gameCount, width=BOARD_WIDTH, height=BOARD_HEIGHT, mineCount=MINE_COUNT,
+             strategyName='solver', workers=None, seed=0, batchSize=BATCH_SIZE):
+    """plays gameCount games across a process pool
+    returns (games won, reveal time histogram, elapsed seconds)
+    """
+    start = time.perf_counter()
+    wins = 0
+    revealTimes = collections.Counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for firstGame in range(0, gameCount, batchSize):
+            batchCount = min(batchSize, gameCount - firstGame)
+            futures.append(executor.submit(playBatch, width, height, mineCount, strategyName,
+                                           seed + firstGame, batchCount))
+        for future in concurrent.futures.as_completed(futures):
+            (batchWins, batchTimes) = future.result()
+            wins += batchWins
+            revealTimes.update(batchTimes)
+    return wins, revealTimes, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='plays minesweeper games without a display')
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--width', type=int, default=BOARD_WIDTH)
+    parser.add_argument('--height', type=int, default=BOARD_HEIGHT)
+    parser.add_argument('--mines', type=int, default=MINE_COUNT)
+    parser.add_argument('--strategy', choices=sorted(STRATEGIES.keys()), default='solver')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error('--workers needs at least 1 worker')
+
+    (wins, revealTimes, elapsed) = simulate(args.games, args.width, args.height, args.mines,
+                                            args.strategy, args.workers, args.seed,
+                                            max(1, min(BATCH_SIZE, args.games // args.workers)))
+    print('%d games on %dx%d with %d mines, %s strategy, %d workers' % (
+        args.games, args.width, args.height, args.mines, args.strategy, args.workers))
+    print('%.1f games/s, %.2f%% won' % (args.games / elapsed, 100.0 * wins / args.games))
+    print('reveal time p50 %dus, p90 %dus, p99 %dus' % (
+        percentile(revealTimes, 0.5), percentile(revealTimes, 0.9), percentile(revealTimes, 0.99)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+import math
+import collections
+
+from minesweeper.board import VISIBLE, MINE, FLAG, COUNT
+
+# solver limits, larger components fall back to an estimate
+MAX_ENUMERATION_NODES = 200000  # search nodes per component
+MAX_ENUMERATION_CELLS = 400  # cells per component, keeps the search within the recursion limit
+MIN_DENSITY = 1e-9  # keeps the mine odds finite on boards that are (nearly) done
+
+# the result of a solve
+# safe: cells that certainly have no mine
+# mines: cells that certainly have a mine
+# probabilities: mine probability of every hidden cell next to a number
+# interiorProbability: mine probability of the hidden cells that do not touch a number
+Solution = collections.namedtuple('Solution', ['safe', 'mines', 'probabilities', 'interiorProbability'])
+
+
+def getNeighbours(x, y):
+    return [(x + xOffset, y + yOffset)
+            for yOffset in range(-1, 2, 1)
+            for xOffset in range(-1, 2, 1)
+            if xOffset or yOffset]
+
+
+def estimateProbabilities(constraints):
+    """estimates the mine probability of every cell as the average density of its constraints"""
+    densities = collections.defaultdict(list)
+    for (cells, mineCount) in constraints:
+        for cell in cells:
+            densities[cell].append(mineCount / float(len(cells)))
+    return dict((cell, sum(values) / len(values)) for (cell, values) in densities.items())
+
+
+def splitComponents(constraints):
+    """splits (cells, mineCount) constraints into groups, that do not share any cells"""
+    parents = {}
+
+    def find(cell):
+        while parents[cell] != cell:
+            parents[cell] = parents[parents[cell]]
+            cell = parents[cell]
+        return cell
+
+    for (cells, mineCount) in constraints:
+        first = None
+        for cell in cells:
+            parents.setdefault(cell, cell)
+            if first is None:
+                first = find(cell)
+            else:
+                parents[find(cell)] = first
+
+    components = collections.defaultdict(list)
+    for constraint in constraints:
+        components[find(next(iter(constraint[0])))].append(constraint)
+    return list(components.values())
+
+
+class Solver:
+    """"finds certain and probable mines from the visible state of a board
+
+    every visible number with hidden neighbours is a constraint on them,
+    constraints that share cells form a component of the frontier.
+    components are solved independently and their results are cached,
+    so after a move only the components that changed are solved again.
+    the constraints are kept up to date by passing the changed cells to update
+    """
+
+    def __init__(self, board, maxNodes=MAX_ENUMERATION_NODES):
+        self.board = board
+        self.maxNodes = maxNodes
+        self.constraints = {}  # numbered cell -> (hidden neighbours, mines among them)
+        self.cache = {}  # component -> solved component
+        self.rescan()
+
+    def rescan(self):
+        """rebuilds all constraints from the board, endless boards are not scanned"""
+        self.constraints = {}
+        for y in range(self.board.height):
+            for x in range(self.board.width):
+                if self.board.isVisible(x, y):
+                    self.updateConstraint(x, y)
+
+    def update(self, cells):
+        """updates the constraints around the passed changed cells"""
+        touched = set()
+        for (x, y) in cells:
+            touched.add((x, y))
+            touched.update(getNeighbours(x, y))
+        for (x, y) in touched:
+            self.updateConstraint(x, y)
+
+    def updateConstraint(self, x, y):
+        """reads the constraint of a single cell, flags are treated as mines"""
+        self.constraints.pop((x, y), None)
+        value = self.board.get(x, y)
+        if not value & VISIBLE or value & MINE or not value & COUNT:
+            return
+
+        hidden = []
+        mineCount = value & COUNT
+        for (neighbourX, neighbourY) in getNeighbours(x, y):
+            neighbour = self.board.get(neighbourX, neighbourY)
+            if neighbour is False or neighbour & VISIBLE:
+                continue
+            if neighbour & FLAG:
+                mineCount -= 1
+            else:
+                hidden.append((neighbourX, neighbourY))
+
+        if hidden:
+            self.constraints[(x, y)] = (frozenset(hidden), mineCount)
+
+    def solve(self):
+        """returns the Solution for the current frontier"""
+        components = splitComponents(list(self.constraints.values()))
+
+        # solve the components, reusing the results of unchanged ones
+        cache = {}
+        for component in components:
+            key = frozenset(component)
+            solved = self.cache.get(key)
+            if solved is None:
+                solved = self.solveComponent(component)
+            cache[key] = solved
+        self.cache = cache
+
+        # combine the components
+        safe = set()
+        mines = set()
+        for (componentSafe, componentMines, enumeration) in cache.values():
+            safe.update(componentSafe)
+            mines.update(componentMines)
+        frontier = set()
+        for (cells, mineCount) in self.constraints.values():
+            frontier.update(cells)
+
+        # mine probabilities, weighting every solution by how likely its mine count is
+        density = min(max(self.getDensity(len(mines)), MIN_DENSITY), 1.0 - MIN_DENSITY)
+        logRatio = math.log(density / (1.0 - density))
+        probabilities = {}
+        expectedMines = len(mines)
+        for (componentSafe, componentMines, enumeration) in cache.values():
+            probabilities.update((cell, 0.0) for cell in componentSafe)
+            probabilities.update((cell, 1.0) for cell in componentMines)
+            componentProbabilities = self.getProbabilities(enumeration, logRatio)
+            probabilities.update(componentProbabilities)
+            expectedMines += sum(componentProbabilities.values())
+
+        # certain cells found by the enumeration
+        for (cell, probability) in probabilities.items():
+            if probability == 0.0:
+                safe.add(cell)
+            elif probability == 1.0:
+                mines.add(cell)
+
+        interiorProbability = self.getInteriorProbability(len(frontier), expectedMines)
+        return Solution(safe, mines, probabilities, interiorProbability)
+
+    def getHiddenCount(self):
+        """returns the amount of hidden cells without a flag, None for endless boards"""
+        if not self.board.width:
+            return None
+        return self.board.width * self.board.height - self.board.visibleCount - self.board.flagCount
+
+    def getDensity(self, knownMines):
+        """returns the mine density of the hidden cells, that are not known to be mines"""
+        mineChance = getattr(self.board, 'mineChance', None)
+        if mineChance is not None:
+            return mineChance
+
+        hiddenCount = self.getHiddenCount() - knownMines
+        mineCount = self.board.mineCount - self.board.flagCount - knownMines
+        if hiddenCount <= 0:
+            return 0.0
+        return min(max(mineCount / float(hiddenCount), 0.0), 1.0)
+
+    def getInteriorProbability(self, frontierCount, expectedFrontierMines):
+        """returns the mine probability of the cells that do not touch a number"""
+        mineChance = getattr(self.board, 'mineChance', None)
+        if mineChance is not None:
+            return mineChance
+
+        interiorCount = self.getHiddenCount() - frontierCount
+        if interiorCount <= 0:
+            return 0.0
+        mineCount = self.board.mineCount - self.board.flagCount - expectedFrontierMines
+        return min(max(mineCount / float(interiorCount), 0.0), 1.0)
+
+    def getProbabilities(self, enumerations, logRatio):
+        """turns the solution counts of the sub components into mine probabilities
+        a solution with k mines is weighted by ratio ** k, where the ratio
+        is the odds of a hidden cell being a mine
+        """
+        probabilities = {}
+        for enumeration in enumerations:
+            if isinstance(enumeration, list):  # too large to enumerate
+                probabilities.update(estimateProbabilities(enumeration))
+                continue
+
+            # the weights are computed relative to the largest one, to stay within float range
+            (solutionsByMines, cells) = enumeration
+            logWeights = dict((mineCount, math.log(solutionCount) + mineCount * logRatio)
+                              for (mineCount, (solutionCount, cellCounts)) in solutionsByMines.items())
+            largest = max(logWeights.values())
+            totalWeight = 0.0
+            cellWeights = dict.fromkeys(cells, 0.0)
+            for (mineCount, (solutionCount, cellCounts)) in solutionsByMines.items():
+                weight = math.exp(logWeights[mineCount] - largest) / solutionCount
+                totalWeight += solutionCount * weight
+                for (cell, count) in cellCounts.items():
+                    cellWeights[cell] += count * weight
+            probabilities.update((cell, cellWeight / totalWeight) for (cell, cellWeight) in cellWeights.items())
+        return probabilities
+
+    def solveComponent(self, component):
+        """finds the certain cells of a component with the single cell and subset rules
+        and enumerates the solutions of the remaining cells
+        returns safe cells, mine cells and (solutions by mine count, cells) of the enumeration
+        a component without any solution, after a wrong flag, has no certain cells and no probabilities
+        """
+        known = {}  # cell -> 0 or 1
+        constraints = self.applyRules(component, known)
+        if constraints is None:  # inconsistent flags, nothing can be deduced
+            return set(), set(), []
+
+        # enumerate every sub component that is left after the rules
+        # the sub components are independent, so their solutions do not need to be combined
+        enumerations = [self.enumerate(subComponent) for subComponent in splitComponents(constraints)]
+        if None in enumerations:  # the rules did not find the contradiction, but the search did
+            return set(), set(), []
+        safe = set(cell for (cell, mine) in known.items() if not mine)
+        mines = set(cell for (cell, mine) in known.items() if mine)
+        return safe, mines, enumerations
+
+    def applyRules(self, component, known):
+        """applies the single cell and subset rules until nothing changes anymore
+        certain cells are stored in known, returns the remaining constraints
+        or None if the constraints contradict each other
+        """
+        constraints = list(component)
+        while True:
+            # remove known cells
+            reduced = set()
+            for (cells, mineCount) in constraints:
+                unknown = frozenset(cell for cell in cells if cell not in known)
+                mineCount -= sum(known[cell] for cell in cells if cell in known)
+                if mineCount < 0 or mineCount > len(unknown):
+                    return None
+                if unknown:
+                    reduced.add((unknown, mineCount))
+            constraints = list(reduced)
+
+            # single cell rule, all or none of the cells are mines
+            found = False
+            for (cells, mineCount) in constraints:
+                if mineCount == 0 or mineCount == len(cells):
+                    for cell in cells:
+                        known[cell] = 1 if mineCount else 0
+                    found = True
+            if found:
+                continue
+
+            # subset rule, the cells outside of a subset hold the difference of the mines
+            byCell = collections.defaultdict(list)
+            for constraint in constraints:
+                for cell in constraint[0]:
+                    byCell[cell].append(constraint)
+            for (cells, mineCount) in constraints:
+                others = set()
+                for cell in cells:
+                    others.update(byCell[cell])
+                for (otherCells, otherMineCount) in others:
+                    if otherCells == cells or not cells < otherCells:
+                        continue
+                    difference = otherCells - cells
+                    remaining = otherMineCount - mineCount
+                    if remaining == 0 or remaining == len(difference):
+                        for cell in difference:
+                            known[cell] = 1 if remaining else 0
+                        found = True
+            if not found:
+                return constraints
+
+    def enumerate(self, constraints):
+        """counts the solutions of the constraints by backtracking
+        returns (mine count -> (solution count, cell -> solutions with a mine), cells)
+        or the constraints themselves, if the component is too large to enumerate,
+        or None if no assignment satisfies the constraints
+        """
+        # order the cells so that neighbouring cells are assigned after each other
+        byCell = collections.defaultdict(list)
+        for (index, (cells, mineCount)) in enumerate(constraints):
+            for cell in cells:
+                byCell[cell].append(index)
+        order = []
+        seen = set()
+        pending = collections.deque([next(iter(constraints[0][0]))])
+        while pending:
+            cell = pending.popleft()
+            if cell in seen:
+                continue
+            seen.add(cell)
+            order.append(cell)
+            for index in byCell[cell]:
+                pending.extend(constraints[index][0])
+
+        required = [mineCount for (cells, mineCount) in constraints]
+        placed = [0] * len(constraints)
+        unassigned = [len(cells) for (cells, mineCount) in constraints]
+        assignment = [0] * len(order)
+        cellConstraints = [byCell[cell] for cell in order]
+        solutions = {}
+        nodes = [0]
+
+        def search(position, mineCount):
+            nodes[0] += 1
+            if nodes[0] > self.maxNodes:
+                return False
+            if position == len(order):
+                solution = solutions.get(mineCount)
+                if solution is None:
+                    solution = solutions[mineCount] = [0, [0] * len(order)]
+                solution[0] += 1
+                cellCounts = solution[1]
+                for (index, mine) in enumerate(assignment):
+                    cellCounts[index] += mine
+                return True
+
+            indices = cellConstraints[position]
+            for mine in (0, 1):
+                valid = True
+                for index in indices:
+                    unassigned[index] -= 1
+                    placed[index] += mine
+                    if placed[index] > required[index] or placed[index] + unassigned[index] < required[index]:
+                        valid = False
+                if valid:
+                    assignment[position] = mine
+                    if not search(position + 1, mineCount + mine):
+                        return False
+                for index in indices:
+                    unassigned[index] += 1
+                    placed[index] -= mine
+            return True
+
+        if len(order) > MAX_ENUMERATION_CELLS or not search(0, 0):
+            return constraints
+        if not solutions:
+            return None
+        return (dict((mineCount, (count, dict(zip(order, cellCounts))))
+                     for (mineCount, (count, cellCounts)) in solutions.items()), order)
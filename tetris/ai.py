@@ -0,0 +1,266 @@
+import time
+import argparse
+import engine
+
+from engine import BOARD_WIDTH, FULL_ROW, TEMPLATE_HEIGHT, PIECES, PIECE_GEOMETRY
+
+try:
+    import numpy
+except ImportError:  # the autoplayer is optional
+    numpy = None
+
+# heuristic weights of the evaluated boards
+HEIGHT_WEIGHT = -0.510066
+LINES_WEIGHT = 0.760666
+HOLES_WEIGHT = -0.35663
+BUMPINESS_WEIGHT = -0.184483
+
+# boards kept after every previewed piece of the search, the best by their score
+BEAM_WIDTH = 200
+
+# empty rows above the board, pieces can start up to PADDING rows above it
+PADDING = TEMPLATE_HEIGHT
+
+# number of set bits of every row
+BIT_COUNTS = None
+if numpy is not None:
+    BIT_COUNTS = numpy.array([bin(row).count('1') for row in range(FULL_ROW + 1)], dtype=numpy.uint8)
+
+# reporting of the soak games
+REPORT_INTERVAL = 5.0
+
+
+def getPlacements(shape):
+    """returns the (rotation, left) of every placement of the shape inside the board,
+    a (placements, TEMPLATE_HEIGHT) array with the row masks of the piece at that placement
+    and an array with the top row of the template of every placement
+    """
+    placements = []
+    for (rotation, geometry) in enumerate(PIECE_GEOMETRY[shape]):
+        for left in range(len(geometry['rows'])):
+            placements.append((rotation, left))
+    masks = numpy.zeros((len(placements), TEMPLATE_HEIGHT), dtype=numpy.uint16)
+    for (index, (rotation, left)) in enumerate(placements):
+        for (templateY, mask) in PIECE_GEOMETRY[shape][rotation]['rows'][left]:
+            masks[index, templateY] = mask
+    tops = numpy.array([PIECE_GEOMETRY[shape][rotation]['minY'] for (rotation, left) in placements])
+    return placements, masks, tops
+
+
+def getRotationPath(fromRotation, toRotation, rotations):
+    """returns the action and the rotations passed on the shortest way between the rotations"""
+    turns = (toRotation - fromRotation) % rotations
+    if turns <= rotations - turns:
+        return engine.ROTATE, [(fromRotation + i) % rotations for i in range(1, turns + 1)]
+    return engine.ROTATE_BACK, [(fromRotation - i) % rotations for i in range(1, rotations - turns + 1)]
+
+
+def getMoves(shape, x, rotation):
+    """returns the moves from a piece at column x in rotation to every placement, which only depend on the position
+    lows and highs are the range of placements passed when sliding sideways, passed holds the placements
+    passed while rotating, and fits is false for the placements whose rotation does not fit at x
+    """
+    (placements, masks, tops) = getPlacements(shape)
+    geometries = PIECE_GEOMETRY[shape]
+    firsts = [0]
+    for geometry in geometries:
+        firsts.append(firsts[-1] + len(geometry['rows']))
+
+    # placement of every rotation at column x, None if it does not fit there
+    starts = []
+    for (index, geometry) in enumerate(geometries):
+        left = x + geometry['minX']
+        starts.append(firsts[index] + left if 0 <= left < len(geometry['rows']) else None)
+
+    (lows, highs, passed, fits) = ([], [], [], [])
+    for (index, (placementRotation, left)) in enumerate(placements):
+        (action, path) = getRotationPath(rotation, placementRotation, len(geometries))
+        path = [rotation] + path
+        fit = all(starts[pathRotation] is not None for pathRotation in path)
+        start = starts[placementRotation] if fit else index
+        lows.append(min(start, index))
+        highs.append(max(start, index))
+        passed.append([starts[pathRotation] if fit else index for pathRotation in path])
+        fits.append(fit)
+
+    # every placement passes the same number of rotations, repeating the first one
+    longest = max(len(path) for path in passed)
+    passed = [path + path[:1] * (longest - len(path)) for path in passed]
+    return numpy.array(lows), numpy.array(highs), numpy.array(passed), numpy.array(fits)
+
+
+# (shape) -> placements and (shape, x, rotation) -> moves, created on the first use
+PLACEMENTS = {}
+MOVES = {}
+
+
+def placePiece(boards, piece):
+    """drops the piece at every reachable placement onto every board of the (boards, height) row array
+    a placement is reachable, if the piece can rotate where it is, slide sideways and fall straight down
+    returns the board index, the placement index, the resulting boards with the complete lines removed
+    and the number of removed lines of every result. placements that stick out of the top are left out
+    """
+    shape = piece['shape']
+    if shape not in PLACEMENTS:
+        PLACEMENTS[shape] = getPlacements(shape)
+    (placements, masks, tops) = PLACEMENTS[shape]
+    position = (shape, piece['x'], piece['rotation'])
+    if position not in MOVES:
+        MOVES[position] = getMoves(*position)
+    (lows, highs, passed, fits) = MOVES[position]
+    (count, height) = boards.shape
+
+    # collision of every placement at every height from the piece down, the rows below the board are full
+    padded = numpy.concatenate([numpy.zeros((count, PADDING), dtype=numpy.uint16), boards,
+                                numpy.full((count, TEMPLATE_HEIGHT), FULL_ROW, dtype=numpy.uint16)], axis=1)
+    start = piece['y'] + PADDING
+    heights = PADDING + height + 1 - start
+    overlaps = numpy.zeros((count, len(placements), heights), dtype=numpy.uint16)
+    for templateY in range(TEMPLATE_HEIGHT):
+        overlaps |= padded[:, None, start + templateY:start + templateY + heights] & masks[None, :, templateY, None]
+    collisions = overlaps != 0
+
+    # the placements that can be reached from the position of the piece,
+    # a slide is free, if no placement between the start and its end collides
+    blocked = numpy.zeros((count, len(placements) + 1), dtype=numpy.intp)
+    numpy.cumsum(collisions[:, :, 0], axis=1, out=blocked[:, 1:])
+    reachable = (blocked[:, highs + 1] == blocked[:, lows]) & ~collisions[:, :, 0][:, passed].any(axis=2) & fits
+
+    # fall until the first collision below the start, placements above the board would end the game
+    landings = start + collisions.argmax(axis=2) - 1
+    reachable &= landings + tops >= PADDING
+    (boardIndexes, placementIndexes) = numpy.nonzero(reachable)
+    results = padded[boardIndexes]
+    rows = landings[boardIndexes, placementIndexes][:, None] + numpy.arange(TEMPLATE_HEIGHT)
+    results[numpy.arange(len(results))[:, None], rows] |= masks[placementIndexes]
+    results = results[:, PADDING:PADDING + height]
+
+    # move the complete rows to the top in order, and clear them, only on the few boards with complete rows
+    complete = results == FULL_ROW
+    lines = complete.sum(axis=1)
+    cleared = numpy.nonzero(lines)[0]
+    if len(cleared):
+        order = numpy.argsort(~complete[cleared], axis=1, kind='stable')
+        compacted = numpy.take_along_axis(results[cleared], order, axis=1)
+        compacted[numpy.arange(height)[None, :] < lines[cleared, None]] = 0
+        results[cleared] = compacted
+    return boardIndexes, placementIndexes, results, lines
+
+
+def evaluateBoards(boards):
+    """returns the heuristic score of every board of the (boards, height) row array, higher is better
+    the columns are filled from their top box down, so every feature is a count of bits of these rows
+    """
+    covered = numpy.bitwise_or.accumulate(boards, axis=1)  # the box itself or any box above it
+    height = BIT_COUNTS[covered].sum(axis=1, dtype=numpy.intp)
+    holes = BIT_COUNTS[covered ^ boards].sum(axis=1, dtype=numpy.intp)
+    # neighbouring columns differ in as many rows, as their heights differ
+    bumpiness = BIT_COUNTS[(covered ^ (covered >> 1)) & (FULL_ROW >> 1)].sum(axis=1, dtype=numpy.intp)
+    return HEIGHT_WEIGHT * height + HOLES_WEIGHT * holes + BUMPINESS_WEIGHT * bumpiness
+
+
+def getBestPlacement(board, piece, preview):
+    """searches every placement of the piece followed by every placement of the preview pieces in order,
+    only the BEAM_WIDTH best boards are searched further after every preview piece
+    returns the (rotation, x) of the piece for the best board, or None if no placement is left
+    the boards can have any height, but only BOARD_WIDTH columns, which fit into the uint16 rows
+    """
+    assert board['width'] == BOARD_WIDTH, 'the autoplayer only plays boards of %d columns' % BOARD_WIDTH
+
+    # the empty rows above the stack are all alike, only the lowest TEMPLATE_HEIGHT of them are searched,
+    # a piece higher up starts as low as new pieces do
+    rows = board['rows']
+    top = next((y for (y, row) in enumerate(rows) if row), len(rows))
+    cut = max(0, top - TEMPLATE_HEIGHT)
+    piece = dict(piece, y=max(piece['y'] - cut, PIECE_GEOMETRY[piece['shape']][piece['rotation']]['spawnY']))
+    boards = numpy.array([rows[cut:]], dtype=numpy.uint16)
+    (unused, placements, boards, lines) = placePiece(boards, piece)
+    if not len(placements):
+        return None
+
+    # the score of a placement is the score of the best board after the preview pieces,
+    # roots holds the placement of the piece that every board started from
+    roots = numpy.arange(len(placements))
+    for nextPiece in preview:
+        if len(boards) > BEAM_WIDTH:
+            best = numpy.argpartition(evaluateBoards(boards) + LINES_WEIGHT * lines, -BEAM_WIDTH)[-BEAM_WIDTH:]
+            (boards, lines, roots) = (boards[best], lines[best], roots[best])
+        (parents, unused, nextBoards, nextLines) = placePiece(boards, nextPiece)
+        if not len(parents):  # every placement ends the game, choose by the pieces before
+            break
+        (boards, lines, roots) = (nextBoards, lines[parents] + nextLines, roots[parents])
+    scores = numpy.full(len(placements), -numpy.inf)
+    numpy.maximum.at(scores, roots, evaluateBoards(boards) + LINES_WEIGHT * lines)
+
+    (rotation, left) = PLACEMENTS[piece['shape']][0][placements[scores.argmax()]]
+    return rotation, left - PIECE_GEOMETRY[piece['shape']][rotation]['minX']
+
+
+def getActions(piece, rotation, x):
+    """returns the engine actions that move the piece to rotation and x and drop it"""
+    (action, path) = getRotationPath(piece['rotation'], rotation, len(PIECES[piece['shape']]))
+    actions = [action] * len(path)
+    if x < piece['x']:
+        actions += [engine.MOVE_LEFT] * (piece['x'] - x)
+    else:
+        actions += [engine.MOVE_RIGHT] * (x - piece['x'])
+    return actions + [engine.DROP]
+
+
+def playPiece(game):
+    """moves and drops the falling piece of the engine to the best placement, looking at the preview pieces
+    returns false if there was no placement left, the piece is dropped where it is then
+    """
+    placement = getBestPlacement(game.board, game.fallingPiece, game.getPreview())
+    if placement is None:
+        game.input(engine.DROP)
+        return False
+    for action in getActions(game.fallingPiece, *placement):
+        game.input(action)
+    return True
+
+
+def playGame(game, maxPieces=None):
+    """plays the engine until the game is over or maxPieces were placed, returns the number of placed pieces"""
+    pieces = 0
+    while not game.gameOver and (maxPieces is None or pieces < maxPieces):
+        piece = game.fallingPiece
+        playPiece(game)
+        while game.fallingPiece is piece and not game.gameOver:  # wait until the piece landed
+            game.tick()
+        pieces += 1
+    return pieces
+
+
+def main():
+    parser = argparse.ArgumentParser(description='plays headless tetris games with the autoplayer and reports the speed')
+    parser.add_argument('--games', type=int, default=1)
+    parser.add_argument('--pieces', type=int, default=10000, help='pieces per game at most')
+    parser.add_argument('--randomizer', choices=list(engine.RANDOMIZERS.keys()), default='uniform')
+    parser.add_argument('--preview', type=int, default=1, help='number of next pieces the search looks at')
+    parser.add_argument('--height', type=int, default=engine.BOARD_HEIGHT)
+    args = parser.parse_args()
+
+    assert numpy is not None, 'the autoplayer needs numpy'
+    start = time.perf_counter()
+    nextReport = REPORT_INTERVAL
+    totalPieces = 0
+    for i in range(args.games):
+        game = engine.Engine(randomizer=args.randomizer, preview=args.preview, height=args.height)
+        pieces = 0
+        while not game.gameOver and pieces < args.pieces:
+            pieces += playGame(game, min(args.pieces - pieces, 100))
+            elapsed = time.perf_counter() - start
+            if elapsed >= nextReport:
+                print('%d pieces, %d lines, %.0f decisions/s' % (
+                    pieces, game.score, (totalPieces + pieces) / elapsed))
+                nextReport += REPORT_INTERVAL
+        totalPieces += pieces
+        print('game %d: %d pieces, %d lines, %s' % (i + 1, pieces, game.score,
+                                                     'game over' if game.gameOver else 'piece limit'))
+    elapsed = time.perf_counter() - start
+    print('%d decisions in %.2fs, %.0f decisions/s' % (totalPieces, elapsed, totalPieces / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+import os
+import sys
+import time
+import random
+import importlib.util
+import pygame
+import engine
+
+# benchmark constants
+POSITION_COUNT = 100000
+BOARD_COUNT = 100
+FILL_CHANCE = 0.4
+TICK_COUNT = 1000000
+ACTION_CHANCE = 0.05  # chance of an input on a tick
+FRAME_COUNT = 2000
+TICKS_PER_FRAME = 4  # engine ticks between two frames at the game speed
+PIECE_COUNT = 200000
+CLEAR_SIZES = [(10, 20, 2000), (100, 1000, 5)]  # width, height and number of boards of every line count
+CLEAR_LINES = [0, 1, 2, 4, 8]
+
+
+# the template scanning implementation, that the bit masks replaced, on the color rows of a board
+def isOnBoard(board, x, y):
+    return 0 <= x < len(board[0]) and y < len(board)
+
+
+def isValidPositionTemplate(board, piece, adjX=0, adjY=0):
+    for y in range(engine.TEMPLATE_HEIGHT):
+        for x in range(engine.TEMPLATE_WIDTH):
+            isAboveBoard = y + piece['y'] + adjY < 0
+            if isAboveBoard or engine.PIECES[piece['shape']][piece['rotation']][y][x] == engine.BLANK:
+                continue
+            if not isOnBoard(board, x + piece['x'] + adjX, y + piece['y'] + adjY):
+                return False
+            if board[y + piece['y'] + adjY][x + piece['x'] + adjX] != engine.BLANK:
+                return False
+    return True
+
+
+def isCompleteLineTemplate(board, y):
+    for x in range(engine.BOARD_WIDTH):
+        if board[y][x] == engine.BLANK:
+            return False
+    return True
+
+
+# the hard drop, that moved the piece down one row at a time
+def getDropDistanceStepwise(board, piece):
+    for i in range(1, engine.BOARD_HEIGHT):
+        if not engine.isValidPosition(board, piece, adjY=i):
+            break
+    return i - 1
+
+
+# the line clearing, that pulled everything above a line down one row for every complete line
+def removeCompleteLinesStepwise(board):
+    numLinesRemoved = 0
+    y = board['height'] - 1
+    while y >= 0:
+        if engine.isCompleteLine(board, y):
+            for pullDownY in range(y, 0, -1):
+                board['rows'][pullDownY] = board['rows'][pullDownY - 1]
+                for x in range(board['width']):
+                    board['colors'][pullDownY][x] = board['colors'][pullDownY - 1][x]
+            board['rows'][0] = 0
+            for x in range(board['width']):
+                board['colors'][0][x] = engine.BLANK
+            numLinesRemoved += 1
+        else:
+            y -= 1
+    return numLinesRemoved
+
+
+# the piece choice, that built the list of shapes again for every piece
+def getNewPieceKeys(rng):
+    shape = rng.choice(list(engine.PIECES.keys()))
+    rotation = rng.randint(0, len(engine.PIECES[shape]) - 1)
+    return {'shape': shape,
+            'rotation': rotation,
+            'x': int(engine.BOARD_WIDTH / 2) - int(engine.TEMPLATE_WIDTH / 2),
+            'y': -2,
+            'color': rng.randint(0, engine.COLOR_COUNT - 1)}
+
+
+# the frame of the driver before the board layer, everything is drawn with rects and the texts are rendered again
+def drawFrameFull(tetris, game):
+    surface = tetris.DISPLAY_SURFACE
+
+    def drawBox(pixelX, pixelY, color):
+        pygame.draw.rect(surface, tetris.COLORS[color], (pixelX + 1, pixelY + 1, tetris.BOX_SIZE - 1, tetris.BOX_SIZE - 1))
+        pygame.draw.rect(surface, tetris.LIGHTCOLORS[color], (pixelX + 1, pixelY + 1, tetris.BOX_SIZE - 4, tetris.BOX_SIZE - 4))
+
+    def drawPiece(piece, pixelX, pixelY):
+        for (x, y) in engine.PIECE_GEOMETRY[piece['shape']][piece['rotation']]['cells']:
+            drawBox(pixelX + (x * tetris.BOX_SIZE), pixelY + (y * tetris.BOX_SIZE), piece['color'])
+
+    surface.fill(tetris.BACKGROUND_COLOR)
+    pygame.draw.rect(surface, tetris.BORDER_COLOR, (tetris.X_MARGIN - 3, tetris.TOP_MARGIN - 7, (engine.BOARD_WIDTH * tetris.BOX_SIZE) + 8, (engine.BOARD_HEIGHT * tetris.BOX_SIZE) + 8), 5)
+    pygame.draw.rect(surface, tetris.BACKGROUND_COLOR, (tetris.X_MARGIN, tetris.TOP_MARGIN, tetris.BOX_SIZE * engine.BOARD_WIDTH, tetris.BOX_SIZE * engine.BOARD_HEIGHT))
+    for y in range(engine.BOARD_HEIGHT):
+        for x in range(engine.BOARD_WIDTH):
+            if game.board['colors'][y][x] != engine.BLANK:
+                drawBox(*tetris.convertToPixelCoords(x, y), game.board['colors'][y][x])
+    for (text, top) in (('Score: %s' % game.score, 20), ('Level: %s' % game.level, 50)):
+        surface.blit(tetris.BASIC_FONT.render(text, True, tetris.TEXT_COLOR), (tetris.WINDOW_WIDTH - 150, top))
+    surface.blit(tetris.BASIC_FONT.render('Next:', True, tetris.TEXT_COLOR), (tetris.WINDOW_WIDTH - 120, 80))
+    drawPiece(game.nextPiece, tetris.WINDOW_WIDTH - 120, 100)
+    drawPiece(game.fallingPiece, *tetris.convertToPixelCoords(game.fallingPiece['x'], game.fallingPiece['y']))
+    return [surface.get_rect()]
+
+
+def loadGame():
+    """returns the game module with a dummy display, the module has a dash in its name, so it is loaded from its path"""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tetris-game.py')
+    spec = importlib.util.spec_from_file_location('tetris', path)
+    tetris = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(tetris)
+
+    pygame.init()
+    tetris.DISPLAY_SURFACE = pygame.display.set_mode((tetris.WINDOW_WIDTH, tetris.WINDOW_HEIGHT))
+    tetris.BASIC_FONT = pygame.font.Font('freesansbold.ttf', tetris.BASIC_FONT_SIZE)
+    return tetris
+
+
+def timeIt(function, *args):
+    """runs function once and returns the result and the elapsed seconds"""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def getRandomBoards(rng):
+    """returns BOARD_COUNT random boards, as (color rows, bit mask board) pairs"""
+    boards = []
+    for i in range(BOARD_COUNT):
+        board = engine.getBlankBoard()
+        for y in range(engine.BOARD_HEIGHT // 2, engine.BOARD_HEIGHT):
+            for x in range(engine.BOARD_WIDTH):
+                if rng.random() < FILL_CHANCE:
+                    board['rows'][y] |= 1 << x
+                    board['colors'][y][x] = 0
+        boards.append((board['colors'], board))
+    return boards
+
+
+def getRandomPieces(rng):
+    """returns POSITION_COUNT random pieces at random positions"""
+    pieces = []
+    for i in range(POSITION_COUNT):
+        shape = rng.choice(sorted(engine.PIECES.keys()))
+        pieces.append({'shape': shape,
+                       'rotation': rng.randrange(len(engine.PIECES[shape])),
+                       'x': rng.randrange(-2, engine.BOARD_WIDTH - 1),
+                       'y': rng.randrange(-2, engine.BOARD_HEIGHT - 1),
+                       'color': 0})
+    return pieces
+
+
+def checkPositions(isValid, boards, pieces, index):
+    valid = 0
+    for (i, piece) in enumerate(pieces):
+        if isValid(boards[i % len(boards)][index], piece):
+            valid += 1
+    return valid
+
+
+def checkLines(isComplete, boards, index):
+    complete = 0
+    for board in boards:
+        for y in range(engine.BOARD_HEIGHT):
+            if isComplete(board[index], y):
+                complete += 1
+    return complete
+
+
+def benchmarkCollision():
+    """tests random pieces against random boards with the template scan and the bit masks"""
+    rng = random.Random(1)
+    boards = getRandomBoards(rng)
+    pieces = getRandomPieces(rng)
+    print('collision: %d random positions on %d boards' % (POSITION_COUNT, BOARD_COUNT))
+    (templateValid, templateTime) = timeIt(checkPositions, isValidPositionTemplate, boards, pieces, 0)
+    (maskValid, maskTime) = timeIt(checkPositions, engine.isValidPosition, boards, pieces, 1)
+    print('template %8.4fs  masks %8.4fs  %5.1fx  (%d and %d valid)' % (
+        templateTime, maskTime, templateTime / maskTime, templateValid, maskValid))
+
+    print('lines: every row of %d boards' % BOARD_COUNT)
+    (templateLines, templateTime) = timeIt(checkLines, isCompleteLineTemplate, boards, 0)
+    (maskLines, maskTime) = timeIt(checkLines, engine.isCompleteLine, boards, 1)
+    print('template %8.4fs  masks %8.4fs  %5.1fx' % (templateTime, maskTime, templateTime / maskTime))
+
+
+def dropPieces(getDistance, boards, pieces):
+    total = 0
+    for (i, piece) in enumerate(pieces):
+        total += getDistance(boards[i % len(boards)], piece)
+    return total
+
+
+def benchmarkDrop():
+    """hard drops new pieces onto random boards, one row at a time and with the column bottoms"""
+    rng = random.Random(2)
+    random.seed(2)  # the pieces come from the global random
+    boards = [board for (colors, board) in getRandomBoards(rng)]
+    pieces = [engine.getNewPiece() for i in range(POSITION_COUNT)]
+    for piece in pieces:
+        piece['x'] += rng.randrange(-2, 3)
+    pieces = [piece for (i, piece) in enumerate(pieces) if engine.isValidPosition(boards[i % len(boards)], piece)]
+    print('drop: %d hard drops on %d boards' % (len(pieces), BOARD_COUNT))
+    (stepRows, stepTime) = timeIt(dropPieces, getDropDistanceStepwise, boards, pieces)
+    (bottomRows, bottomTime) = timeIt(dropPieces, engine.getDropDistance, boards, pieces)
+    print('stepwise %8.4fs  bottoms %8.4fs  %5.1fx  (%d and %d rows)' % (
+        stepTime, bottomTime, stepTime / bottomTime, stepRows, bottomRows))
+
+
+def benchmarkEngine():
+    """runs headless games for TICK_COUNT ticks with random inputs"""
+    rng = random.Random(3)
+    actions = [rng.randrange(1, engine.DROP + 1) if rng.random() < ACTION_CHANCE else engine.NONE
+               for i in range(TICK_COUNT)]
+    games = [engine.Engine(3)]
+
+    start = time.perf_counter()
+    for action in actions:
+        game = games[-1]
+        if game.gameOver:
+            game = engine.Engine(len(games) + 3)
+            games.append(game)
+        game.step(action)
+    seconds = time.perf_counter() - start
+    print('engine: %d ticks in %.2fs, %d ticks/s, %d games, %d lines' % (
+        TICK_COUNT, seconds, TICK_COUNT / seconds, len(games), sum(game.score for game in games)))
+
+
+def getClearBoard(rng, width, height, lines):
+    """returns a board with a random lower half, with the complete lines spread over it"""
+    board = engine.getBlankBoard(width, height)
+    stack = height // 2
+    complete = set(height - 1 - i * (stack // max(lines, 1)) for i in range(lines))
+    for y in range(height - stack, height):
+        row = rng.getrandbits(width) & ~(1 << rng.randrange(width))  # at least one free spot
+        if y in complete:
+            row = board['fullRow']
+        board['rows'][y] = row
+        for x in range(width):
+            if row >> x & 1:
+                board['colors'][y][x] = 0
+    return board
+
+
+def clearLines(removeLines, boards):
+    return sum(removeLines(board) for board in boards)
+
+
+def benchmarkLines():
+    """clears lines with the stepwise pull down and the single pass, on small and tall boards"""
+    rng = random.Random(6)
+    for (width, height, count) in CLEAR_SIZES:
+        print('lines: %dx%d boards, %d clears per line count' % (width, height, count))
+        for lines in CLEAR_LINES:
+            board = getClearBoard(rng, width, height, lines)
+            copies = [dict(board, rows=list(board['rows']), colors=[list(row) for row in board['colors']])
+                      for i in range(2 * count)]
+            (stepLines, stepTime) = timeIt(clearLines, removeCompleteLinesStepwise, copies[:count])
+            (passLines, passTime) = timeIt(clearLines, engine.removeCompleteLines, copies[count:])
+            assert stepLines == passLines == lines * count
+            assert copies[0]['rows'] == copies[-1]['rows'] and copies[0]['colors'] == copies[-1]['colors']
+            print('%2d lines  stepwise %10.2fus  single pass %8.2fus  per clear  %7.1fx' % (
+                lines, stepTime * 1e6 / count, passTime * 1e6 / count, stepTime / passTime))
+
+
+def benchmarkPieces():
+    """generates PIECE_COUNT pieces with the old piece choice and with the streams of every randomizer"""
+    print('pieces: %d pieces' % PIECE_COUNT)
+    rng = random.Random(5)
+    (pieces, seconds) = timeIt(lambda: [getNewPieceKeys(rng) for i in range(PIECE_COUNT)])
+    print('%-8s %8.4fs  %8d pieces/s' % ('keys', seconds, PIECE_COUNT / seconds))
+    for randomizer in engine.RANDOMIZERS:
+        game = engine.Engine(5, randomizer=randomizer)
+        (pieces, seconds) = timeIt(game.getPreview, PIECE_COUNT)
+        print('%-8s %8.4fs  %8d pieces/s' % (randomizer, seconds, PIECE_COUNT / seconds))
+
+
+def drawFrames(drawFrame):
+    """plays FRAME_COUNT frames with random inputs, returns the seconds spent drawing and updating the display"""
+    rng = random.Random(4)
+    game = engine.Engine(4)
+    seconds = 0.0
+    for frame in range(FRAME_COUNT):
+        if game.gameOver:
+            game = engine.Engine(game.seed + 1)
+        for tick in range(TICKS_PER_FRAME):
+            game.step(rng.randrange(1, engine.DROP + 1) if rng.random() < ACTION_CHANCE else engine.NONE)
+        start = time.perf_counter()
+        pygame.display.update(drawFrame(game))
+        seconds += time.perf_counter() - start
+    return seconds
+
+
+def benchmarkRender():
+    """draws the frames of a game, everything on every frame and with the board layer"""
+    tetris = loadGame()
+    view = tetris.GameView()
+    print('render: %d frames' % FRAME_COUNT)
+    fullTime = drawFrames(lambda game: drawFrameFull(tetris, game))
+    viewTime = drawFrames(view.draw)
+    print('full %8.3fms  layer %8.3fms  per frame  %5.1fx' % (
+        fullTime * 1000 / FRAME_COUNT, viewTime * 1000 / FRAME_COUNT, fullTime / viewTime))
+
+
+BENCHMARKS = {'collision': benchmarkCollision,
+              'drop': benchmarkDrop,
+              'engine': benchmarkEngine,
+              'lines': benchmarkLines,
+              'pieces': benchmarkPieces,
+              'render': benchmarkRender}
+
+
+def main():
+    """usage: benchmark [name ...]"""
+    names = sys.argv[1:] or list(BENCHMARKS.keys())
+    for name in names:
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,518 @@
+import random
+import itertools
+import collections
+
+# the rules run in ticks, a fixed step of game time
+TICKS_PER_SECOND = 100
+
+# movement, in ticks until a held key moves the piece again
+MOVE_SIDEWAYS_FREQ = 15
+MOVE_DOWN_FREQ = 10
+
+# falling, in ticks until the piece falls one row
+FALL_FREQ = 27
+FALL_FREQ_STEP = 2  # the piece falls faster on every level
+LINES_PER_LEVEL = 10
+
+# board sizes, of the shown game, engines can play boards of any size
+BOARD_WIDTH = 10
+BOARD_HEIGHT = 20
+BLANK = '.'
+FULL_ROW = (1 << BOARD_WIDTH) - 1  # row mask without free spots
+
+# number of block colors, pieces store the index of their color
+COLOR_COUNT = 4
+
+# history randomizer, a shape is rolled again up to HISTORY_ROLLS times, while it is one of the last HISTORY_SIZE shapes
+HISTORY_SIZE = 4
+HISTORY_ROLLS = 4
+HISTORY_START = ['Z', 'S', 'Z', 'S']  # the first piece is never one of these, if it can be helped
+
+# piece sizes
+TEMPLATE_WIDTH = 5
+TEMPLATE_HEIGHT = 5
+
+S_SHAPE_TEMPLATE = [['.....',
+                     '.....',
+                     '..OO.',
+                     '.OO..',
+                     '.....'],
+                    ['.....',
+                     '..O..',
+                     '..OO.',
+                     '...O.',
+                     '.....']]
+
+Z_SHAPE_TEMPLATE = [['.....',
+                     '.....',
+                     '.OO..',
+                     '..OO.',
+                     '.....'],
+                    ['.....',
+                     '..O..',
+                     '.OO..',
+                     '.O...',
+                     '.....']]
+
+I_SHAPE_TEMPLATE = [['..O..',
+                     '..O..',
+                     '..O..',
+                     '..O..',
+                     '.....'],
+                    ['.....',
+                     '.....',
+                     'OOOO.',
+                     '.....',
+                     '.....']]
+
+O_SHAPE_TEMPLATE = [['.....',
+                     '.....',
+                     '.OO..',
+                     '.OO..',
+                     '.....']]
+
+J_SHAPE_TEMPLATE = [['.....',
+                     '.O...',
+                     '.OOO.',
+                     '.....',
+                     '.....'],
+                    ['.....',
+                     '..OO.',
+                     '..O..',
+                     '..O..',
+                     '.....'],
+                    ['.....',
+                     '.....',
+                     '.OOO.',
+                     '...O.',
+                     '.....'],
+                    ['.....',
+                     '..O..',
+                     '..O..',
+                     '.OO..',
+                     '.....']]
+
+L_SHAPE_TEMPLATE = [['.....',
+                     '...O.',
+                     '.OOO.',
+                     '.....',
+                     '.....'],
+                    ['.....',
+                     '..O..',
+                     '..O..',
+                     '..OO.',
+                     '.....'],
+                    ['.....',
+                     '.....',
+                     '.OOO.',
+                     '.O...',
+                     '.....'],
+                    ['.....',
+                     '.OO..',
+                     '..O..',
+                     '..O..',
+                     '.....']]
+
+T_SHAPE_TEMPLATE = [['.....',
+                     '..O..',
+                     '.OOO.',
+                     '.....',
+                     '.....'],
+                    ['.....',
+                     '..O..',
+                     '..OO.',
+                     '..O..',
+                     '.....'],
+                    ['.....',
+                     '.....',
+                     '.OOO.',
+                     '..O..',
+                     '.....'],
+                    ['.....',
+                     '..O..',
+                     '.OO..',
+                     '..O..',
+                     '.....']]
+
+PIECES = {'S': S_SHAPE_TEMPLATE,
+          'Z': Z_SHAPE_TEMPLATE,
+          'J': J_SHAPE_TEMPLATE,
+          'L': L_SHAPE_TEMPLATE,
+          'I': I_SHAPE_TEMPLATE,
+          'O': O_SHAPE_TEMPLATE,
+          'T': T_SHAPE_TEMPLATE}
+SHAPES = list(PIECES.keys())
+
+
+def compileTemplate(template, boardWidth=BOARD_WIDTH):
+    """turns a template into the geometry of the piece on a board of boardWidth, it is computed once for every rotation
+    cells are the (x, y) template offsets of the boxes, minX, maxX, minY, maxY their bounding box
+    rows[left] holds the (templateY, row mask) of every row, shifted so that the left box is in board column left
+    bottoms are the (x, y) offsets of the lowest box of every column
+    spawnX, spawnY is the position of new pieces, centered above the board
+    """
+    cells = tuple((x, y) for y in range(TEMPLATE_HEIGHT) for x in range(TEMPLATE_WIDTH) if template[y][x] != BLANK)
+    minX, maxX = min(x for (x, y) in cells), max(x for (x, y) in cells)
+    minY, maxY = min(y for (x, y) in cells), max(y for (x, y) in cells)
+
+    masks = []
+    for y in range(minY, maxY + 1):
+        mask = 0
+        for (cellX, cellY) in cells:
+            if cellY == y:
+                mask |= 1 << (cellX - minX)
+        masks.append((y, mask))
+    rows = tuple(tuple((y, mask << left) for (y, mask) in masks)
+                 for left in range(boardWidth - (maxX - minX)))
+
+    bottoms = tuple((x, max(y for (cellX, y) in cells if cellX == x)) for x in range(minX, maxX + 1))
+    return {'cells': cells, 'rows': rows, 'bottoms': bottoms,
+            'minX': minX, 'maxX': maxX, 'minY': minY, 'maxY': maxY,
+            'spawnX': (boardWidth - (maxX - minX)) // 2 - minX, 'spawnY': -2}
+
+
+# shape -> geometry of every rotation
+PIECE_GEOMETRY = dict((shape, [compileTemplate(template) for template in templates])
+                      for (shape, templates) in PIECES.items())
+
+# board width -> piece geometry, other widths are compiled on their first use
+BOARD_GEOMETRY = {BOARD_WIDTH: PIECE_GEOMETRY}
+
+
+def getPieceGeometry(boardWidth):
+    """returns the piece geometry of boards with boardWidth columns, only the rows and the spawnX differ"""
+    if boardWidth not in BOARD_GEOMETRY:
+        BOARD_GEOMETRY[boardWidth] = dict((shape, [compileTemplate(template, boardWidth) for template in templates])
+                                          for (shape, templates) in PIECES.items())
+    return BOARD_GEOMETRY[boardWidth]
+
+# actions, one per input, they are small ints to be easy to store
+NONE = 0
+MOVE_LEFT = 1
+MOVE_RIGHT = 2
+MOVE_DOWN = 3
+STOP_LEFT = 4
+STOP_RIGHT = 5
+STOP_DOWN = 6
+ROTATE = 7
+ROTATE_BACK = 8
+DROP = 9
+
+
+def calculateLevelAndFallFreq(score):
+    """based on the score, return the level the player is on
+    and how many ticks pass until a falling piece falls one step
+    """
+    level = int(score / LINES_PER_LEVEL) + 1
+    fallFreq = max(1, FALL_FREQ - (level * FALL_FREQ_STEP))
+    return level, fallFreq
+
+
+def getNewPiece(rng=random, shape=None, boardWidth=BOARD_WIDTH):
+    """return a new piece of the shape, or a random one, in a random rotation and color, drawn from rng
+    the piece starts centered above a board of boardWidth
+    """
+    if shape is None:
+        shape = rng.choice(SHAPES)
+    rotation = rng.randrange(len(PIECES[shape]))
+    geometry = getPieceGeometry(boardWidth)[shape][rotation]
+    newPiece = {'shape': shape,
+                'rotation': rotation,
+                'x': geometry['spawnX'],
+                'y': geometry['spawnY'], # start it above the board
+                'color': rng.randrange(COLOR_COUNT)}
+    return newPiece
+
+
+def uniformShapes(rng):
+    """yields every shape with the same chance, independent of the shapes before"""
+    while True:
+        yield rng.choice(SHAPES)
+
+
+def bagShapes(rng):
+    """yields every shape once in a shuffled bag, then continues with a new bag"""
+    while True:
+        bag = list(SHAPES)
+        rng.shuffle(bag)
+        yield from bag
+
+
+def historyShapes(rng):
+    """yields shapes, that are rolled again while they are one of the recent shapes, up to HISTORY_ROLLS times"""
+    recent = collections.deque(HISTORY_START, maxlen=HISTORY_SIZE)
+    while True:
+        for roll in range(HISTORY_ROLLS):
+            shape = rng.choice(SHAPES)
+            if shape not in recent:
+                break
+        recent.append(shape)
+        yield shape
+
+
+# name -> generator of the shapes, from an rng
+RANDOMIZERS = {'uniform': uniformShapes,
+               'bag': bagShapes,
+               'history': historyShapes}
+
+
+def generatePieces(rng, randomizer='uniform', boardWidth=BOARD_WIDTH):
+    """yields the new pieces of a game, their shapes come from the randomizer
+    all the pieces are drawn from rng, so the same rng state gives the same pieces
+    """
+    for shape in RANDOMIZERS[randomizer](rng):
+        yield getNewPiece(rng, shape, boardWidth)
+
+
+def addToBoard(board, piece):
+    geometry = board['geometry'][piece['shape']][piece['rotation']]
+    for (templateY, mask) in geometry['rows'][piece['x'] + geometry['minX']]:
+        board['rows'][templateY + piece['y']] |= mask
+    for (x, y) in geometry['cells']:
+        board['colors'][y + piece['y']][x + piece['x']] = piece['color']
+    board['dirty'] = True
+
+
+def getBlankBoard(width=BOARD_WIDTH, height=BOARD_HEIGHT):
+    """creates an empty board
+    rows holds one int per row, with bit x set if column x is taken
+    colors holds the color of every box for drawing
+    dirty is set whenever a box changes, until the board was drawn again
+    width, height, fullRow and the piece geometry of the width are kept with the board
+    """
+    board = {'rows': [0] * height,
+             'colors': [],
+             'dirty': True,
+             'width': width,
+             'height': height,
+             'fullRow': (1 << width) - 1,
+             'geometry': getPieceGeometry(width)}
+    for i in range(height):
+        board['colors'].append([BLANK] * width)
+    return board
+
+
+def isValidPosition(board, piece, adjX=0, adjY=0):
+    """returns true, if the piece is withing the board and not colliding
+    each row of the piece is a single and with the board row
+    """
+    geometry = board['geometry'][piece['shape']][piece['rotation']]
+    left = piece['x'] + adjX + geometry['minX']
+    if left < 0 or piece['x'] + adjX + geometry['maxX'] >= board['width']:  # out of bounds
+        return False
+
+    rows = board['rows']
+    top = piece['y'] + adjY
+    for (templateY, mask) in geometry['rows'][left]:
+        y = templateY + top
+        if y < 0:  # just started, above the board
+            continue
+        if y >= board['height'] or rows[y] & mask:  # out of bounds or collision
+            return False
+
+    # valid position
+    return True
+
+
+def getDropDistance(board, piece):
+    """returns how many rows the piece can fall, only the lowest box of every column can land"""
+    geometry = board['geometry'][piece['shape']][piece['rotation']]
+    rows = board['rows']
+    height = board['height']
+    distance = height - piece['y']  # the bottom of the board is the farthest
+    for (x, y) in geometry['bottoms']:
+        bit = 1 << (x + piece['x'])
+        y += piece['y']
+        below = y + 1
+        while below < height and below - y <= distance and (below < 0 or not rows[below] & bit):
+            below += 1
+        distance = min(distance, below - y - 1)
+    return distance
+
+
+def isCompleteLine(board, y):
+    """returns true if the line does not contain any free spots"""
+    return board['rows'][y] == board['fullRow']
+
+
+def removeCompleteLines(board):
+    """remove any completed lines on the board,
+    move everything above them down,
+    and return the number of completed lines
+    every row is moved once, the kept rows are packed below the cleared ones in a single pass,
+    so the cost only depends on the height and not on the number of lines
+    """
+    rows = board['rows']
+    fullRow = board['fullRow']
+    complete = [y for (y, row) in enumerate(rows) if row == fullRow]
+    if not complete:
+        return 0
+
+    # the color rows of the complete lines are blanked and reused as the new top rows
+    colors = board['colors']
+    cleared = [colors[y] for y in complete]
+    for colorRow in cleared:
+        colorRow[:] = [BLANK] * board['width']
+    colors[:] = cleared + [colorRow for (row, colorRow) in zip(rows, colors) if row != fullRow]
+    rows[:] = [0] * len(complete) + [row for row in rows if row != fullRow]
+    board['dirty'] = True
+    return len(complete)
+
+
+class Engine:
+    """"the rules of a single game, without any drawing or timing
+
+    the game advances by calling tick once per step of TICKS_PER_SECOND,
+    inputs are applied with input in between. all the timing is counted
+    in ticks, so a game can be run at any speed and gives the same result
+    for the same seed and the same actions on the same ticks.
+    recording engines keep every input as (tick, action) in actions.
+    the pieces come from a stream of the randomizer, which is only read
+    as far as the pieces are looked at, preview is the number of shown pieces.
+    the board can have any width and height
+    """
+
+    def __init__(self, seed=None, record=False, randomizer='uniform', preview=1, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.rng = random.Random(seed)  # the pieces only depend on the seed
+        self.randomizer = randomizer
+        self.pieces = generatePieces(self.rng, randomizer, width)
+        self.upcoming = collections.deque()  # generated pieces, that did not fall yet
+        self.preview = preview
+        self.actions = [] if record else None
+
+        self.board = getBlankBoard(width, height)
+        self.ticks = 0
+        self.score = 0
+        self.level, self.fallFreq = calculateLevelAndFallFreq(self.score)
+        self.gameOver = False
+
+        # held keys and the tick of their last move
+        self.movingDown = False
+        self.movingLeft = False
+        self.movingRight = False
+        self.lastMoveDownTick = 0
+        self.lastMoveSidewaysTick = 0
+        self.lastFallTick = 0
+
+        self.fallingPiece = None
+        self.nextPiece = None
+        self.spawnPiece()
+
+    def getPreview(self, count=None):
+        """returns the next count pieces after the falling piece, the preview pieces by default"""
+        if count is None:
+            count = self.preview
+        while len(self.upcoming) < count:
+            self.upcoming.append(next(self.pieces))
+        return list(itertools.islice(self.upcoming, count))
+
+    def spawnPiece(self):
+        """lets the next piece fall"""
+        self.getPreview(1)
+        self.fallingPiece = self.upcoming.popleft()
+        self.nextPiece = self.getPreview(1)[0]
+
+    def step(self, action=NONE):
+        """applies the action and advances the game by one tick"""
+        if action != NONE:
+            self.input(action)
+        self.tick()
+
+    def input(self, action):
+        """applies an action to the falling piece, returns true if it was moved"""
+        piece = self.fallingPiece
+        if self.gameOver:
+            return False
+        if self.actions is not None:
+            self.actions.append((self.ticks, action))
+
+        # moving sideways
+        if action == MOVE_LEFT or action == MOVE_RIGHT:
+            adjX = -1 if action == MOVE_LEFT else 1
+            if not isValidPosition(self.board, piece, adjX=adjX):
+                return False
+            piece['x'] += adjX
+            self.movingLeft = action == MOVE_LEFT
+            self.movingRight = action == MOVE_RIGHT
+            self.lastMoveSidewaysTick = self.ticks
+            return True
+
+        # rotate shape if there is space
+        if action == ROTATE or action == ROTATE_BACK:
+            rotations = len(PIECES[piece['shape']])
+            rotation = piece['rotation']
+            piece['rotation'] = (rotation + (1 if action == ROTATE else -1)) % rotations
+            if not isValidPosition(self.board, piece):  # undo rotation
+                piece['rotation'] = rotation
+                return False
+            return True
+
+        # make block fall faster
+        if action == MOVE_DOWN:
+            self.movingDown = True
+            self.lastMoveDownTick = self.ticks
+            if isValidPosition(self.board, piece, adjY=1):
+                piece['y'] += 1
+                return True
+            return False
+
+        # move the current block all the way down
+        if action == DROP:
+            self.movingDown = False
+            self.movingLeft = False
+            self.movingRight = False
+            distance = getDropDistance(self.board, piece)
+            piece['y'] += distance
+            return distance > 0
+
+        if action == STOP_LEFT:
+            self.movingLeft = False
+        elif action == STOP_RIGHT:
+            self.movingRight = False
+        elif action == STOP_DOWN:
+            self.movingDown = False
+        return False
+
+    def tick(self):
+        """advances the game by one tick, moves the held keys and lets the piece fall
+        returns the number of lines that were removed
+        """
+        if self.gameOver:
+            return 0
+        self.ticks += 1
+        board = self.board
+        piece = self.fallingPiece
+
+        # handle moving the block because of held keys
+        if (self.movingLeft or self.movingRight) and self.ticks - self.lastMoveSidewaysTick >= MOVE_SIDEWAYS_FREQ:
+            if self.movingLeft and isValidPosition(board, piece, adjX=-1):
+                piece['x'] -= 1
+            elif self.movingRight and isValidPosition(board, piece, adjX=1):
+                piece['x'] += 1
+            self.lastMoveSidewaysTick = self.ticks
+
+        if (self.movingDown and self.ticks - self.lastMoveDownTick >= MOVE_DOWN_FREQ
+                and isValidPosition(board, piece, adjY=1)):
+            piece['y'] += 1
+            self.lastMoveDownTick = self.ticks
+
+        # let the piece fall if it is time to fall
+        if self.ticks - self.lastFallTick < self.fallFreq:
+            return 0
+        self.lastFallTick = self.ticks
+        if isValidPosition(board, piece, adjY=1):
+            piece['y'] += 1
+            return 0
+
+        # landed, continue with the next piece
+        addToBoard(board, piece)
+        lines = removeCompleteLines(board)
+        self.score += lines
+        self.level, self.fallFreq = calculateLevelAndFallFreq(self.score)
+        self.spawnPiece()
+        if not isValidPosition(board, self.fallingPiece):
+            self.gameOver = True
+        return lines
@@ -0,0 +1,148 @@
+import sys
+import time
+import struct
+import hashlib
+import argparse
+import engine
+
+# replay file format
+# header: magic, version, randomizer code, seed of the engine, board width and height
+# followed by one varint per action, with the ticks since the previous action shifted left by ACTION_BITS
+# and the action in the low bits. the END action closes the log, its ticks lead to the last tick of the game.
+# after it the final score as varint and the HASH_SIZE bytes hash of the final board follow
+REPLAY_MAGIC = b'TTRP'
+REPLAY_HEADER = struct.Struct('<4sHBxQHH')
+ACTION_BITS = 4
+END = (1 << ACTION_BITS) - 1
+HASH_SIZE = 8
+RANDOMIZER_CODES = list(engine.RANDOMIZERS.keys())  # the randomizer is stored as its index
+
+VERSION = 3
+
+
+def getBoardHash(board):
+    """returns HASH_SIZE bytes, that only depend on the boxes and their colors"""
+    return hashlib.blake2b(repr((board['rows'], board['colors'])).encode(), digest_size=HASH_SIZE).digest()
+
+
+def packVarint(value):
+    """returns value as little endian base 128 bytes, the high bit is set on all but the last byte"""
+    data = bytearray()
+    while value >= 0x80:
+        data.append((value & 0x7F) | 0x80)
+        value >>= 7
+    data.append(value)
+    return bytes(data)
+
+
+def unpackVarint(data, offset):
+    """returns the value of the varint at offset and the offset after it"""
+    (value, shift) = (0, 0)
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+class Recorder:
+    """writes the actions of a recording engine to a replay file, while the game is played
+
+    write appends the actions since the last call, close ends the log with
+    the final tick, score and board hash, which playback checks against
+    """
+
+    def __init__(self, game, path):
+        assert game.actions is not None, 'only recording engines can be written'
+        self.game = game
+        self.file = open(path, 'wb')
+        self.file.write(REPLAY_HEADER.pack(REPLAY_MAGIC, VERSION,
+                                             RANDOMIZER_CODES.index(game.randomizer), game.seed,
+                                             game.board['width'], game.board['height']))
+        self.written = 0  # number of written actions
+        self.lastTick = 0  # tick of the last written action
+
+    def write(self):
+        for (tick, action) in self.game.actions[self.written:]:
+            self.file.write(packVarint(((tick - self.lastTick) << ACTION_BITS) | action))
+            self.lastTick = tick
+        self.written = len(self.game.actions)
+
+    def close(self):
+        self.write()
+        self.file.write(packVarint(((self.game.ticks - self.lastTick) << ACTION_BITS) | END))
+        self.file.write(packVarint(self.game.score))
+        self.file.write(getBoardHash(self.game.board))
+        self.file.close()
+
+
+def loadReplay(path):
+    """reads a replay file written by a Recorder
+    returns a dict with the seed, the randomizer, the board size, the (tick, action) list, the number of ticks, the score and the board hash
+    """
+    with open(path, 'rb') as replayFile:
+        data = replayFile.read()
+
+    (magic, version, randomizerCode, seed, width, height) = REPLAY_HEADER.unpack_from(data)
+    assert magic == REPLAY_MAGIC and version == VERSION, 'not a tetris replay'
+    actions = []
+    (tick, offset) = (0, REPLAY_HEADER.size)
+    while True:
+        (value, offset) = unpackVarint(data, offset)
+        tick += value >> ACTION_BITS
+        if value & END == END:
+            break
+        actions.append((tick, value & END))
+    (score, offset) = unpackVarint(data, offset)
+    return {'seed': seed, 'randomizer': RANDOMIZER_CODES[randomizerCode], 'width': width, 'height': height,
+            'actions': actions, 'ticks': tick, 'score': score,
+            'boardHash': data[offset:offset + HASH_SIZE]}
+
+
+def playback(game, replay):
+    """applies the actions of the replay to a new engine of the replay on their ticks
+    yields after every tick, until the tick count of the replay or the end of the game
+    """
+    actions = replay['actions']
+    index = 0
+    while game.ticks < replay['ticks'] and not game.gameOver:
+        while index < len(actions) and actions[index][0] == game.ticks:
+            game.input(actions[index][1])
+            index += 1
+        game.tick()
+        yield game.ticks
+
+
+def checkReplay(replay):
+    """plays the replay as fast as possible, returns the engine and true if it ended like the recorded game"""
+    game = engine.Engine(replay['seed'], randomizer=replay['randomizer'], width=replay['width'], height=replay['height'])
+    for tick in playback(game, replay):
+        pass
+    matches = (game.ticks == replay['ticks'] and game.score == replay['score']
+               and getBoardHash(game.board) == replay['boardHash'])
+    return game, matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='plays tetris replays headless and checks their final score and board')
+    parser.add_argument('paths', nargs='+')
+    args = parser.parse_args()
+
+    failed = 0
+    for path in args.paths:
+        replay = loadReplay(path)
+        start = time.perf_counter()
+        (game, matches) = checkReplay(replay)
+        seconds = time.perf_counter() - start
+        print('%s: %s, %d ticks, %d actions, score %d, %.0f ticks/s' % (
+            path, 'ok' if matches else 'MISMATCH', game.ticks, len(replay['actions']), game.score,
+            game.ticks / max(seconds, 1e-9)))
+        if not matches:
+            failed += 1
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
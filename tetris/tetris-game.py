@@ -1,16 +1,20 @@
+import os
 import sys
 import random
 import time
+import argparse
+import functools
 import pygame
+import engine
+import replay
+import ai
+
 from pygame.locals import *
+from engine import BOARD_WIDTH, BOARD_HEIGHT, BLANK, PIECE_GEOMETRY
 
 # define constants
 FPS = 25
 
-# movement
-MOVE_SIDEWAYS_FREQ = 0.15
-MOVE_DOWN_FREQ = 0.1
-
 # pixel sizes
 BASIC_FONT_SIZE = 18
 BIG_FONT_SIZE = 100
@@ -18,15 +22,23 @@ WINDOW_WIDTH = 640
 WINDOW_HEIGHT = 480
 
 # board sizes
-BOARD_WIDTH = 10
-BOARD_HEIGHT = 20
 BOX_SIZE = 20
-BLANK = '.'
 
 # margin sizes
 X_MARGIN = int((WINDOW_WIDTH - BOARD_WIDTH * BOX_SIZE) / 2)
 TOP_MARGIN = WINDOW_HEIGHT - (BOARD_HEIGHT * BOX_SIZE) - 5
 
+# screen areas, the play area holds the border and the space above the board, where new pieces appear
+PLAY_RECT = pygame.Rect(X_MARGIN - 3, 0, (BOARD_WIDTH * BOX_SIZE) + 8, TOP_MARGIN + (BOARD_HEIGHT * BOX_SIZE) + 1)
+STATUS_RECT = pygame.Rect(WINDOW_WIDTH - 150, 20, 150, 55)
+NEXT_RECT = pygame.Rect(WINDOW_WIDTH - 120, 80, 120, WINDOW_HEIGHT - 80)  # down to the bottom, for longer previews
+
+# number of rendered texts that are kept
+TEXT_CACHE_SIZE = 64
+
+# every played game is recorded into a new file in the replay directory
+REPLAY_DIR = 'replays'
+
 # colors
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
@@ -50,131 +62,35 @@ TEXT_SHADOW_COLOR = GRAY
 COLORS = (BLUE, GREEN, RED, YELLOW)
 LIGHTCOLORS = (LIGHTBLUE, LIGHTGREEN, LIGHTRED, LIGHTYELLOW)
 assert len(COLORS) == len(LIGHTCOLORS), 'each color must have a light color equivalent'
+assert len(COLORS) == engine.COLOR_COUNT, 'each piece color of the engine must have a color'
+
+# pre-rendered boxes by color, created on the first use
+BLOCK_SPRITES = {}
 
-# piece sizes
-TEMPLATE_WIDTH = 5
-TEMPLATE_HEIGHT = 5
-
-S_SHAPE_TEMPLATE = [['.....',
-                     '.....',
-                     '..OO.',
-                     '.OO..',
-                     '.....'],
-                    ['.....',
-                     '..O..',
-                     '..OO.',
-                     '...O.',
-                     '.....']]
-
-Z_SHAPE_TEMPLATE = [['.....',
-                     '.....',
-                     '.OO..',
-                     '..OO.',
-                     '.....'],
-                    ['.....',
-                     '..O..',
-                     '.OO..',
-                     '.O...',
-                     '.....']]
-
-I_SHAPE_TEMPLATE = [['..O..',
-                     '..O..',
-                     '..O..',
-                     '..O..',
-                     '.....'],
-                    ['.....',
-                     '.....',
-                     'OOOO.',
-                     '.....',
-                     '.....']]
-
-O_SHAPE_TEMPLATE = [['.....',
-                     '.....',
-                     '.OO..',
-                     '.OO..',
-                     '.....']]
-
-J_SHAPE_TEMPLATE = [['.....',
-                     '.O...',
-                     '.OOO.',
-                     '.....',
-                     '.....'],
-                    ['.....',
-                     '..OO.',
-                     '..O..',
-                     '..O..',
-                     '.....'],
-                    ['.....',
-                     '.....',
-                     '.OOO.',
-                     '...O.',
-                     '.....'],
-                    ['.....',
-                     '..O..',
-                     '..O..',
-                     '.OO..',
-                     '.....']]
-
-L_SHAPE_TEMPLATE = [['.....',
-                     '...O.',
-                     '.OOO.',
-                     '.....',
-                     '.....'],
-                    ['.....',
-                     '..O..',
-                     '..O..',
-                     '..OO.',
-                     '.....'],
-                    ['.....',
-                     '.....',
-                     '.OOO.',
-                     '.O...',
-                     '.....'],
-                    ['.....',
-                     '.OO..',
-                     '..O..',
-                     '..O..',
-                     '.....']]
-
-T_SHAPE_TEMPLATE = [['.....',
-                     '..O..',
-                     '.OOO.',
-                     '.....',
-                     '.....'],
-                    ['.....',
-                     '..O..',
-                     '..OO.',
-                     '..O..',
-                     '.....'],
-                    ['.....',
-                     '.....',
-                     '.OOO.',
-                     '..O..',
-                     '.....'],
-                    ['.....',
-                     '..O..',
-                     '.OO..',
-                     '..O..',
-                     '.....']]
-
-PIECES = {'S': S_SHAPE_TEMPLATE,
-          'Z': Z_SHAPE_TEMPLATE,
-          'J': J_SHAPE_TEMPLATE,
-          'L': L_SHAPE_TEMPLATE,
-          'I': I_SHAPE_TEMPLATE,
-          'O': O_SHAPE_TEMPLATE,
-          'T': T_SHAPE_TEMPLATE}
-
-# inputs
-UP = 'up'
-DOWN = 'down'
-LEFT = 'left'
-RIGHT = 'right'
+# keys -> engine actions
+KEY_DOWN_ACTIONS = {K_LEFT: engine.MOVE_LEFT, K_a: engine.MOVE_LEFT,
+                    K_RIGHT: engine.MOVE_RIGHT, K_d: engine.MOVE_RIGHT,
+                    K_UP: engine.ROTATE, K_w: engine.ROTATE,  # clockwise
+                    K_q: engine.ROTATE_BACK,  # counter clockwise
+                    K_DOWN: engine.MOVE_DOWN, K_s: engine.MOVE_DOWN,
+                    K_SPACE: engine.DROP}
+KEY_UP_ACTIONS = {K_LEFT: engine.STOP_LEFT, K_a: engine.STOP_LEFT,
+                  K_RIGHT: engine.STOP_RIGHT, K_d: engine.STOP_RIGHT,
+                  K_DOWN: engine.STOP_DOWN, K_s: engine.STOP_DOWN}
 
 
 def main():
     global FPS_CLOCK, DISPLAY_SURFACE, BASIC_FONT, BIG_FONT
 
+    parser = argparse.ArgumentParser(description='plays tetris, or shows a recorded game')
+    parser.add_argument('--replay', help='replay file to show at normal speed')
+    parser.add_argument('--randomizer', choices=list(engine.RANDOMIZERS.keys()), default='uniform')
+    parser.add_argument('--preview', type=int, default=1, help='number of next pieces that are shown')
+    args = parser.parse_args()
+    recorded = replay.loadReplay(args.replay) if args.replay else None
+    if recorded is not None and (recorded['width'], recorded['height']) != (BOARD_WIDTH, BOARD_HEIGHT):
+        parser.error('only replays of %dx%d boards can be shown' % (BOARD_WIDTH, BOARD_HEIGHT))
+
     # init pygame
     pygame.init()
     FPS_CLOCK = pygame.time.Clock()
@@ -194,137 +110,103 @@ def main():
 
         # play music
         pygame.mixer.music.play(-1, 0.0)
-        runGame()
+        runGame(args.randomizer, args.preview, recorded)
         pygame.mixer.stop()
         showTextScreen('Game Over')
 
 
-def runGame():
-    board = getBlankBoard()
-    lastMoveDownTime = time.time()
-    lastMoveSideWaysTime = time.time()
-    lastFallTime = time.time()
-    movingDown = False
-    movingLeft = False
-    movingRight = False
-    score = 0
-    level, fallFreq = calculateLevelAndFallFreq(score)
+def getReplayPath():
+    """returns a new file name in the REPLAY_DIR, games of the same second are numbered"""
+    if not os.path.isdir(REPLAY_DIR):
+        os.makedirs(REPLAY_DIR)
+    name = time.strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(REPLAY_DIR, name + '.replay')
+    number = 1
+    while os.path.exists(path):
+        number += 1
+        path = os.path.join(REPLAY_DIR, '%s-%d.replay' % (name, number))
+    return path
 
-    fallingPiece = getNewPiece()
-    nextPiece = getNewPiece()
 
-    while True:
-
-        # no falling piece in play, create a new one at the top
-        if fallingPiece == None:
-            fallingPiece = nextPiece
-            nextPiece = getNewPiece()
-            lastFallTime = time.time()
-
-            if not isValidPosition(board, fallingPiece):
-                return  # game over
-
-        # process-input()
-        # process events
-        checkForQuit()
-        for event in pygame.event.get():
-            if event.type == KEYUP:
-                if event.key == K_p:  # pause game
-                    DISPLAY_SURFACE.fill(BACKGROUND_COLOR)
-                    pygame.mixer.music.stop()
-                    showTextScreen('Paused') # pause until a key press
-                    pygame.mixer.music.play(-1, 0.0)
-                    lastFallTime = time.time()
-                    lastMoveDownTime = time.time()
-                    lastMoveSideWaysTime = time.time()
-                elif event.key == K_LEFT or event.key == K_a:
-                    movingLeft = False
-                elif event.key == K_RIGHT or event.key == K_d:
-                    movingRight = False
-                elif event.key == K_DOWN or event.key == K_s:
-                    movingDown = False
-
-            elif event.type == KEYDOWN:
-                # moving sideways
-                if (event.key == K_LEFT or event.key == K_a) and isValidPosition(board, fallingPiece, adjX=-1):
-                    fallingPiece['x'] -= 1
-                    movingLeft = True
-                    movingRight = False
-                    lastMoveSideWaysTime = time.time()
-                elif (event.key == K_RIGHT or event.key == K_d) and isValidPosition(board, fallingPiece, adjX=1):
-                    fallingPiece['x'] += 1
-                    movingRight = True
-                    movingLeft = False
-                    lastMoveSideWaysTime = time.time()
-
-                # rotate shape if there is space
-                elif event.key == K_UP or event.key == K_w: # clockwise
-                    fallingPiece['rotation'] = (fallingPiece['rotation'] + 1) % len(PIECES[fallingPiece['shape']])
-                    if not isValidPosition(board, fallingPiece): # undo rotation
-                        fallingPiece['rotation'] = (fallingPiece['rotation'] - 1) % len(PIECES[fallingPiece['shape']])
-
-                elif event.key == K_q: # counter clockwise
-                    fallingPiece['rotation'] = (fallingPiece['rotation'] - 1) % len(PIECES[fallingPiece['shape']])
-                    if not isValidPosition(board, fallingPiece): # undo rotation
-                        fallingPiece['rotation'] = (fallingPiece['rotation'] + 1) % len(PIECES[fallingPiece['shape']])
-
-                # make block fall faster
-                elif event.key == K_DOWN or event.key == K_s:
-                    movingDown = True
-                    if isValidPosition(board, fallingPiece, adjY=1):
-                        fallingPiece['y'] += 1
-                    lastMoveDownTime = time.time()
-
-                # move the current block all the way down
-                elif event.key == K_SPACE:
-                    movingDown = False
-                    movingLeft = False
-                    movingRight = False
-                    for i in range(1, BOARD_HEIGHT):
-                        if not isValidPosition(board, fallingPiece, adjY=i):  # lower as far as possible
-                            break
-                    fallingPiece['y'] += i - 1
-
-        # update()
-        # handle moving the block because of user input
-        if (movingLeft or movingRight) and time.time() - lastMoveSideWaysTime > MOVE_SIDEWAYS_FREQ:
-            if movingLeft and isValidPosition(board, fallingPiece, adjX=-1):
-                fallingPiece['x'] -= 1
-            elif movingRight and isValidPosition(board, fallingPiece, adjX=1):
-                fallingPiece['x'] += 1
-            lastMoveSideWaysTime = time.time()
-
-        if movingDown and time.time() - lastMoveDownTime > MOVE_DOWN_FREQ and isValidPosition(board, fallingPiece, adjY=1):
-            fallingPiece['y'] += 1
-            lastMoveDownTime = time.time()
-
-        # let the piece fall if it is time to fall
-        if time.time() - lastFallTime > fallFreq:
-            if not isValidPosition(board, fallingPiece, adjY=1): # landed
-                addToBoard(board, fallingPiece)
-                score += removeCompleteLines(board)
-                level, fallFreq = calculateLevelAndFallFreq(score)
-                fallingPiece = None
-            else: # not landed move the block
-                fallingPiece['y'] += 1
-                lastFallTime = time.time()
-
-
-        # draw()
-        # draw everything to the screen
-        DISPLAY_SURFACE.fill(BACKGROUND_COLOR)
-        drawBoard(board)
-        drawStatus(score, level)
-        drawNextPiece(nextPiece)
-        if fallingPiece != None:
-            drawPiece(fallingPiece)
-
-        pygame.display.update()
-        FPS_CLOCK.tick(FPS)
+def runGame(randomizer, preview, recorded=None):
+    """plays a game and records it, or shows the passed replay with its own randomizer
+    the keys are ignored while a replay is shown, except for pausing
+    """
+    if recorded is None:
+        game = engine.Engine(record=True, randomizer=randomizer, preview=preview)
+        recorder = replay.Recorder(game, getReplayPath())
+        playback = None
+    else:
+        game = engine.Engine(recorded['seed'], randomizer=recorded['randomizer'], preview=preview)
+        recorder = None
+        playback = replay.playback(game, recorded)
+    lastTime = time.time()
+    pendingTicks = 0.0
+    autoplay = False
+    playedPiece = None  # the last piece moved by the autoplayer
+    view = GameView()
+
+    try:
+        while not game.gameOver:
+            # process-input()
+            # process events
+            checkForQuit()
+            for event in pygame.event.get():
+                if event.type == KEYUP:
+                    if event.key == K_p:  # pause game
+                        DISPLAY_SURFACE.fill(BACKGROUND_COLOR)
+                        pygame.mixer.music.stop()
+                        showTextScreen('Paused') # pause until a key press
+                        pygame.mixer.music.play(-1, 0.0)
+                        lastTime = time.time()  # the engine does not move while paused
+                        view.repaint()
+                    elif playback is not None:  # the replay does all the moves
+                        continue
+                    elif event.key == K_i and ai.numpy is not None:  # toggle the autoplayer
+                        autoplay = not autoplay
+                    elif event.key in KEY_UP_ACTIONS:
+                        game.input(KEY_UP_ACTIONS[event.key])
+
+                elif event.type == KEYDOWN and event.key in KEY_DOWN_ACTIONS and playback is None:
+                    game.input(KEY_DOWN_ACTIONS[event.key])
+
+            # let the autoplayer move every new piece once
+            if autoplay and game.fallingPiece is not playedPiece:
+                playedPiece = game.fallingPiece
+                ai.playPiece(game)
+
+            # update()
+            # run as many ticks as fit into the time since the last frame
+            now = time.time()
+            pendingTicks += (now - lastTime) * engine.TICKS_PER_SECOND
+            lastTime = now
+            while pendingTicks >= 1 and not game.gameOver:
+                if playback is None:
+                    game.tick()
+                elif next(playback, None) is None:  # end of the replay
+                    return
+                pendingTicks -= 1
+            if recorder is not None:
+                recorder.write()
+
+            # draw()
+            # draw what changed to the screen
+            pygame.display.update(view.draw(game))
+            FPS_CLOCK.tick(FPS)
+    finally:
+        # games that were quit are stored up to the last tick
+        if recorder is not None:
+            recorder.close()
+
+
+@functools.lru_cache(maxsize=TEXT_CACHE_SIZE)
+def getTextSurface(text, font, color):
+    """returns the rendered text, the last TEXT_CACHE_SIZE used texts are kept"""
+    return font.render(text, True, color)
 
 
 def makeTextObjs(text, font, color):
-    surf = font.render(text, True, color)
+    surf = getTextSurface(text, font, color)
     return surf, surf.get_rect()
 
 
@@ -382,104 +264,21 @@ def checkForQuit():
             pygame.event.post(event)
 
 
-def calculateLevelAndFallFreq(score):
-    """based on the score, return the level the player is on
-    and how many seconds pass until a falling piece falls one step
-    """
-    level = int(score / 10) + 1
-    fallFreq = 0.27 - (level * 0.02)
-    return level, fallFreq
-
-
-def getNewPiece():
-    """return a random new piece in a random rotation and color"""
-    shape = random.choice(list(PIECES.keys()))
-    newPiece = {'shape': shape,
-                'rotation': random.randint(0, len(PIECES[shape]) - 1),
-                'x': int(BOARD_WIDTH / 2) - int(TEMPLATE_WIDTH / 2),
-                'y': -2, # start it above the board
-                'color': random.randint(0, len(COLORS) - 1)}
-    return newPiece
-
-
-def addToBoard(board, piece):
-    for y in range(TEMPLATE_HEIGHT):
-        for x in range(TEMPLATE_WIDTH):
-            if PIECES[piece['shape']][piece['rotation']][y][x] != BLANK:
-                board[y + piece['y']][x + piece['x']] = piece['color']
-
-
-def getBlankBoard():
-    """creates an empty board"""
-    board = []
-    for i in range(BOARD_HEIGHT):
-        board.append([BLANK] * BOARD_WIDTH)
-    return board
-
-
-def isOnBoard(x, y):
-    # note: cool python syntax for comparison with constants
-    return 0 <= x < BOARD_WIDTH and y < BOARD_HEIGHT
-
-
-def isValidPosition(board, piece, adjX=0, adjY=0):
-    """returns true, if the piece is withing the board and not colliding"""
-    for y in range(TEMPLATE_HEIGHT):
-        for x in range(TEMPLATE_WIDTH):
-            isAboveBoard = y + piece['y'] + adjY < 0
-            if isAboveBoard or PIECES[piece['shape']][piece['rotation']][y][x] == BLANK:  # just started
-                continue
-            if not isOnBoard(x + piece['x'] + adjX, y + piece['y'] + adjY):  # out of bounds
-                return False
-            if board[y + piece['y'] + adjY][x + piece['x'] + adjX] != BLANK:  # collision
-                return
-
-    # valid position
-    return True
-
-
-def isCompleteLine(board, y):
-    """returns true if the line does not contain any free spots"""
-    for x in range(BOARD_WIDTH):
-        if board[y][x] == BLANK:
-            return False
-    return True
-
-
-def removeCompleteLines(board):
-    """remove any completed lines on the board,
-    move everything above them down,
-    and return the number of completed lines
-    """
-    numLinesRemoved = 0
-    y = BOARD_HEIGHT - 1 # start y at the bottom of the board
-    while y >= 0:
-        if isCompleteLine(board, y):
-            # remove the line and pull boxes down by one line
-            for pullDownY in range(y, 0, -1):
-                for x in range(BOARD_WIDTH):
-                    board[pullDownY][x] = board[pullDownY - 1][x]
-
-            # set very top line to blank
-            for x in range(BOARD_WIDTH):
-                board[0][x] = BLANK
-            numLinesRemoved += 1
-
-        # only increment y, when we did not remove a line
-        # otherwise we skip checking whether the pulled down boxes
-        # form a complete line
-        else:
-            y -= 1
-
-    # return the amount of removed lines
-    return numLinesRemoved
-
-
 def convertToPixelCoords(boxX, boxY):
     """convert the given xy board coordinates to screen coordinates"""
     return (X_MARGIN + (boxX * BOX_SIZE)), (TOP_MARGIN + (boxY * BOX_SIZE))
 
 
+def getBlockSprite(color):
+    """returns the box of the color, without the one pixel gap at its top and left"""
+    if color not in BLOCK_SPRITES:
+        sprite = pygame.Surface((BOX_SIZE - 1, BOX_SIZE - 1)).convert()
+        sprite.fill(COLORS[color])
+        sprite.fill(LIGHTCOLORS[color], (0, 0, BOX_SIZE - 4, BOX_SIZE - 4))
+        BLOCK_SPRITES[color] = sprite
+    return BLOCK_SPRITES[color]
+
+
 def drawBox(boxX, boxY, color, pixelX=None, pixelY=None):
     """draw a single box (each piece has four boxes)
     at xy coordinates on the board. Or, if pixelX & pixelY
@@ -493,32 +292,37 @@ def drawBox(boxX, boxY, color, pixelX=None, pixelY=None):
         pixelX, pixelY = convertToPixelCoords(boxX, boxY)
 
     # draw to pixel coordinates
-    pygame.draw.rect(DISPLAY_SURFACE, COLORS[color], (pixelX + 1, pixelY + 1, BOX_SIZE - 1, BOX_SIZE - 1))
-    pygame.draw.rect(DISPLAY_SURFACE, LIGHTCOLORS[color], (pixelX + 1, pixelY + 1, BOX_SIZE - 4, BOX_SIZE - 4))
+    DISPLAY_SURFACE.blit(getBlockSprite(color), (pixelX + 1, pixelY + 1))
 
 
-def drawBoard(board):
+def drawBoard(board, surface):
+    """draws the border, the background and the boxes of the board onto the surface of the PLAY_RECT"""
+    (left, top) = PLAY_RECT.topleft
+    surface.fill(BACKGROUND_COLOR)
+
     # draw border
-    pygame.draw.rect(DISPLAY_SURFACE, BORDER_COLOR, (X_MARGIN - 3, TOP_MARGIN - 7, (BOARD_WIDTH * BOX_SIZE) + 8, (BOARD_HEIGHT * BOX_SIZE) + 8), 5)
+    pygame.draw.rect(surface, BORDER_COLOR, (X_MARGIN - 3 - left, TOP_MARGIN - 7 - top, (BOARD_WIDTH * BOX_SIZE) + 8, (BOARD_HEIGHT * BOX_SIZE) + 8), 5)
 
     # draw background of the board
-    pygame.draw.rect(DISPLAY_SURFACE, BACKGROUND_COLOR, (X_MARGIN, TOP_MARGIN, BOX_SIZE * BOARD_WIDTH, BOX_SIZE * BOARD_HEIGHT))
+    pygame.draw.rect(surface, BACKGROUND_COLOR, (X_MARGIN - left, TOP_MARGIN - top, BOX_SIZE * BOARD_WIDTH, BOX_SIZE * BOARD_HEIGHT))
 
     # draw boxes
-    for y in range(BOARD_HEIGHT):
-        for x in range(BOARD_WIDTH):
-            drawBox(x, y, board[y][x])
+    boxes = []
+    for (y, row) in enumerate(board['colors']):
+        for (x, color) in enumerate(row):
+            if color != BLANK:
+                pixelX, pixelY = convertToPixelCoords(x, y)
+                boxes.append((getBlockSprite(color), (pixelX + 1 - left, pixelY + 1 - top)))
+    surface.blits(boxes, False)
 
 
 def drawStatus(score, level):
     """draws score & level text"""
-    scoreSurf = BASIC_FONT.render('Score: %s' % score, True, TEXT_COLOR)
-    scoreRect = scoreSurf.get_rect()
+    scoreSurf, scoreRect = makeTextObjs('Score: %s' % score, BASIC_FONT, TEXT_COLOR)
     scoreRect.topleft = (WINDOW_WIDTH - 150, 20)
     DISPLAY_SURFACE.blit(scoreSurf, scoreRect)
 
-    levelSurf = BASIC_FONT.render('Level: %s' % level, True, TEXT_COLOR)
-    levelRect = levelSurf.get_rect()
+    levelSurf, levelRect = makeTextObjs('Level: %s' % level, BASIC_FONT, TEXT_COLOR)
     levelRect.topleft = (WINDOW_WIDTH - 150, 50)
     DISPLAY_SURFACE.blit(levelSurf, levelRect)
 
@@ -527,28 +331,88 @@ def drawPiece(piece, pixelX=None, pixelY=None):
     """draws a piece either on the passed pixel coords
     or uses the pieces board position
     to calculate the screen position
+    returns the screen rect around the piece
     """
-    shapeToDraw = PIECES[piece['shape']][piece['rotation']]
     if pixelX is None and pixelY is None:
         # if no pixel position specified, use location data from the piece
         pixelX, pixelY = convertToPixelCoords(piece['x'], piece['y'])
 
     # draw each block from the shape
-    for y in range(TEMPLATE_HEIGHT):
-        for x in range(TEMPLATE_WIDTH):
-            if shapeToDraw[y][x] != BLANK:
-                drawBox(None, None, piece['color'], pixelX + (x * BOX_SIZE), pixelY + (y * BOX_SIZE))
+    geometry = PIECE_GEOMETRY[piece['shape']][piece['rotation']]
+    for (x, y) in geometry['cells']:
+        drawBox(None, None, piece['color'], pixelX + (x * BOX_SIZE), pixelY + (y * BOX_SIZE))
+    return pygame.Rect(pixelX + (geometry['minX'] * BOX_SIZE), pixelY + (geometry['minY'] * BOX_SIZE),
+                       (geometry['maxX'] - geometry['minX'] + 1) * BOX_SIZE, (geometry['maxY'] - geometry['minY'] + 1) * BOX_SIZE)
 
 
-def drawNextPiece(piece):
+def drawNextPiece(pieces):
     # draw next text
-    nextSurf = BASIC_FONT.render('Next:', True, TEXT_COLOR)
-    nextRect = nextSurf.get_rect()
+    nextSurf, nextRect = makeTextObjs('Next:', BASIC_FONT, TEXT_COLOR)
     nextRect.topleft = (WINDOW_WIDTH - 120, 80)
     DISPLAY_SURFACE.blit(nextSurf, nextRect)
 
-    #draw the next piece (outside playing field)
-    drawPiece(piece, pixelX=WINDOW_WIDTH-120, pixelY=100)
+    #draw the next pieces (outside playing field), each one a free row below the one before
+    pixelY = 100
+    for (i, piece) in enumerate(pieces):
+        if i:
+            pixelY = pieceRect.bottom + BOX_SIZE - PIECE_GEOMETRY[piece['shape']][piece['rotation']]['minY'] * BOX_SIZE
+        pieceRect = drawPiece(piece, pixelX=WINDOW_WIDTH-120, pixelY=pixelY)
+
+
+class GameView:
+    """"draws an engine onto the display, but only what changed since the last frame
+
+    the border and the locked boxes are drawn onto a layer of the play area,
+    which is only drawn again when the board changed. a frame copies the layer
+    back where the falling piece was and draws the piece at its new position,
+    the status and the preview are only drawn when they changed.
+    draw returns the changed rects for pygame.display.update
+    """
+
+    def __init__(self):
+        self.layer = pygame.Surface(PLAY_RECT.size).convert()
+        self.repaint()
+
+    def repaint(self):
+        """makes the next draw redraw the whole screen, after something else was drawn onto it"""
+        self.full = True
+        self.pieceRect = None  # screen rect of the drawn falling piece
+        self.status = None  # drawn score and level
+        self.nextPiece = None  # first drawn preview piece, the preview moves on with it
+
+    def draw(self, game):
+        changedRects = []
+        if self.full:
+            DISPLAY_SURFACE.fill(BACKGROUND_COLOR)
+            changedRects.append(DISPLAY_SURFACE.get_rect())
+            game.board['dirty'] = True
+            self.full = False
+
+        # the background of the play area, everything when the board changed or else only below the last piece
+        if game.board['dirty']:
+            drawBoard(game.board, self.layer)
+            game.board['dirty'] = False
+            DISPLAY_SURFACE.blit(self.layer, PLAY_RECT)
+            changedRects.append(PLAY_RECT)
+        elif self.pieceRect is not None:
+            DISPLAY_SURFACE.blit(self.layer, self.pieceRect, self.pieceRect.move(-PLAY_RECT.left, -PLAY_RECT.top))
+            changedRects.append(self.pieceRect)
+
+        self.pieceRect = drawPiece(game.fallingPiece)
+        changedRects.append(self.pieceRect)
+
+        if (game.score, game.level) != self.status:
+            DISPLAY_SURFACE.fill(BACKGROUND_COLOR, STATUS_RECT)
+            drawStatus(game.score, game.level)
+            changedRects.append(STATUS_RECT)
+            self.status = (game.score, game.level)
+
+        if game.nextPiece is not self.nextPiece:
+            DISPLAY_SURFACE.fill(BACKGROUND_COLOR, NEXT_RECT)
+            drawNextPiece(game.getPreview())
+            changedRects.append(NEXT_RECT)
+            self.nextPiece = game.nextPiece
+        return changedRects
 
 
 if __name__ == '__main__':